@@ -1,12 +1,19 @@
+import asyncio
 import warnings
 from dotenv import load_dotenv
 import os
+from typing import AsyncIterator, List, Tuple
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain.memory import ConversationSummaryBufferMemory
 from langchain_google_community import GoogleSearchAPIWrapper
 from langchain_community.retrievers.web_research import WebResearchRetriever
+from langchain_community.document_loaders import AsyncHtmlLoader
+from langchain_community.document_transformers import Html2TextTransformer
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain.chains import RetrievalQAWithSourcesChain
+from find_icp.my_embeddings import CachedEmbeddings
 
 # Following this tutorial:
 # https://blog.nextideatech.com/how-to-use-google-search-with-langchain-openai/
@@ -33,8 +40,12 @@ class QuestionAnsweringSystem:
             streaming=True,
             openai_api_key=openai_api_key,
         )
+        # page chunks the retriever has embedded before are served from the cache
+        self.embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(), path="./chroma_db_oai/embeddings.sqlite3"
+        )
         self.vector_store = Chroma(
-            embedding_function=OpenAIEmbeddings(), persist_directory="./chroma_db_oai"
+            embedding_function=self.embeddings, persist_directory="./chroma_db_oai"
         )
         self.conversation_memory = ConversationSummaryBufferMemory(
             llm=self.chat_model,
@@ -56,6 +67,8 @@ class QuestionAnsweringSystem:
         self.qa_chain = RetrievalQAWithSourcesChain.from_chain_type(
             self.chat_model, retriever=self.web_research_retriever
         )
+        # page loads still indexing for later questions
+        self._indexing = set()
 
     def answer_question(self, user_input_question):
         # Query the QA chain with the user input question
@@ -64,10 +77,117 @@ class QuestionAnsweringSystem:
         # Return the answer and sources
         return result["answer"], result["sources"]
 
+    async def astream_answer(
+        self,
+        user_input_question: str,
+        num_results: int = 3,
+        page_timeout: float = 3.0,
+        k: int = 4,
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream the answer, yielding (answer so far, sources) as tokens arrive.
+
+        Unlike `answer_question` this skips the LLM step that writes search
+        queries. The search and the lookup of already indexed pages run
+        concurrently, and the answer starts streaming from those docs and the
+        search snippets right away. Result pages not indexed yet are loaded
+        and indexed in the background for later questions; pages that take
+        longer than `page_timeout` are left out. Await `aindexing` before the
+        event loop closes to keep them.
+        """
+        search_results, indexed_docs = await asyncio.gather(
+            asyncio.to_thread(
+                self.google_search.results, user_input_question, num_results
+            ),
+            self.vector_store.asimilarity_search(user_input_question, k=k),
+        )
+        snippet_docs = [
+            Document(page_content=r["snippet"], metadata={"source": r["link"]})
+            for r in search_results
+            if r.get("snippet") and r.get("link")
+        ]
+
+        task = asyncio.create_task(
+            self._aindex_pages(
+                [r["link"] for r in search_results if r.get("link")], page_timeout
+            )
+        )
+        self._indexing.add(task)
+        task.add_done_callback(self._indexing.discard)
+        docs = indexed_docs + snippet_docs
+
+        sources = ", ".join(dict.fromkeys(d.metadata.get("source", "") for d in docs))
+        context = "\n\n".join(
+            f"Source: {d.metadata.get('source', 'unknown')}\n{d.page_content}"
+            for d in docs
+        )
+        messages = [
+            SystemMessage(
+                content="Answer the question using only the sources below. "
+                "If they don't contain the answer, say that you don't know."
+            ),
+            HumanMessage(content=f"{context}\n\nQuestion: {user_input_question}"),
+        ]
+
+        answer = ""
+        async for chunk in self.chat_model.astream(messages):
+            answer += chunk.content
+            yield answer, sources
+
+    async def aindexing(self) -> None:
+        """Wait for the result pages still being indexed in the background."""
+        if self._indexing:
+            await asyncio.gather(*self._indexing, return_exceptions=True)
+
+    async def _aindex_pages(self, urls: List[str], timeout: float) -> None:
+        new_docs = await self._aload_pages(urls, timeout)
+        if new_docs:
+            await self.vector_store.aadd_documents(new_docs)
+
+    async def _aload_pages(self, urls: List[str], timeout: float) -> List[Document]:
+        """Load, convert and split result pages the retriever has not indexed yet."""
+        retriever = self.web_research_retriever
+        new_urls = [
+            url for url in dict.fromkeys(urls) if url not in retriever.url_database
+        ]
+        if not new_urls:
+            return []
+        loader = AsyncHtmlLoader(
+            new_urls,
+            ignore_load_errors=True,
+            requests_per_second=len(new_urls),
+            preserve_order=False,
+        )
+        # keep the pages that arrive in time, in the order they finish
+        pages = []
+        stream = loader.alazy_load()
+        deadline = asyncio.get_running_loop().time() + timeout
+        try:
+            while (remaining := deadline - asyncio.get_running_loop().time()) > 0:
+                page = await asyncio.wait_for(anext(stream), remaining)
+                if page.page_content:
+                    pages.append(page)
+        except (StopAsyncIteration, asyncio.TimeoutError):
+            pass
+        finally:
+            await stream.aclose()
+        retriever.url_database.extend(page.metadata["source"] for page in pages)
+        docs = Html2TextTransformer().transform_documents(pages)
+        return retriever.text_splitter.split_documents(list(docs))
+
+
+async def stream_to_console(qa_system: QuestionAnsweringSystem, question: str) -> None:
+    printed = 0
+    sources = ""
+    print("Answer: ", end="", flush=True)
+    async for answer, sources in qa_system.astream_answer(question):
+        print(answer[printed:], end="", flush=True)
+        printed = len(answer)
+    print("\nSources:", sources)
+    await qa_system.aindexing()
+
 
 if __name__ == "__main__":
     qa_system = QuestionAnsweringSystem()
     user_input_question = input("Ask a question: ")
-    answer, sources = qa_system.answer_question(user_input_question)
-    print("Answer:", answer)
-    print("Sources:", sources)
+    asyncio.run(stream_to_console(qa_system, user_input_question))
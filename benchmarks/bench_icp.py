@@ -0,0 +1,283 @@
+"""
+End-to-end throughput and latency benchmark for the ICP research flows.
+
+Every flow runs over the same fixed company list against stubbed (default) or
+replayed model and search backends, each in its own subprocess so peak RSS is
+measured per flow:
+
+    # compare against benchmarks/baseline.json, exit 1 on a regression; flows
+    # without a baseline yet are recorded there and pass with a warning
+    python benchmarks/bench_icp.py
+
+    # accept the current numbers as the new baseline
+    python benchmarks/bench_icp.py --update-baseline
+
+    # replay fixtures recorded with find_icp/my_replay.py instead of stubs
+    python benchmarks/bench_icp.py --backend replay --llm-latency 0.2
+
+Reported per flow: p50/p95 per-company latency, companies/minute, tokens per
+company, search calls per company, peak RSS and error rate.
+"""
+
+import argparse
+import json
+import os
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+COMPANIES = [
+    "Blackstone",
+    "Fidelity Investments",
+    "Stripe",
+    "Spotify",
+    "Airbnb",
+    "Shopify",
+    "Siemens",
+    "Unilever",
+]
+
+# name -> (script, flow function)
+FLOWS = {
+    "research_flow": ("find_icp/main.py", "research_flow"),
+    "research_flow_parent": ("find_icp/with_subflows.py", "research_flow_parent"),
+    "icp_tool": ("icp/tool_icp.py", "generate_icp_report"),
+    "icp_type": ("icp/type_icp.py", "generate_icp_report"),
+}
+
+# How far a metric may move in the bad direction before it counts as a
+# regression: relative to the baseline, except error_rate which is absolute.
+TOLERANCES = {
+    "p50_latency_s": 0.25,
+    "p95_latency_s": 0.25,
+    "companies_per_min": 0.20,
+    "tokens_per_company": 0.10,
+    "searches_per_company": 0.10,
+    "peak_rss_mb": 0.20,
+    "error_rate": 0.0,
+}
+HIGHER_IS_BETTER = {"companies_per_min"}
+
+
+class _Counter:
+    """Thread-safe tally of tokens and search calls across a worker run."""
+
+    def __init__(self):
+        self.tokens = 0
+        self.searches = 0
+        self._lock = threading.Lock()
+
+    def add(self, tokens: int = 0, searches: int = 0) -> None:
+        with self._lock:
+            self.tokens += tokens
+            self.searches += searches
+
+
+def _count_searches(counter: _Counter) -> None:
+    from langchain_google_community import GoogleSearchAPIWrapper
+
+    for method in ("run", "results"):
+        original = getattr(GoogleSearchAPIWrapper, method)
+
+        def counted(self, *args, _original=original, **kwargs):
+            counter.add(searches=1)
+            return _original(self, *args, **kwargs)
+
+        setattr(GoogleSearchAPIWrapper, method, counted)
+
+
+def _count_tokens(counter: _Counter) -> None:
+    import controlflow as cf
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenCounter(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs) -> None:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            tokens = usage.get("total_tokens", 0)
+            if not usage:
+                for generations in response.generations:
+                    for generation in generations:
+                        message = getattr(generation, "message", None)
+                        metadata = getattr(message, "usage_metadata", None) or {}
+                        tokens += metadata.get("total_tokens", 0)
+            counter.add(tokens=tokens)
+
+    model = cf.defaults.model
+    model.callbacks = [*(model.callbacks or []), TokenCounter()]
+
+
+def run_worker(flow: str, companies: List[str], args: argparse.Namespace) -> dict:
+    """Run one flow over `companies` in this process and measure it."""
+    from find_icp.my_replay import install
+
+    os.environ["ICP_TRACE_PATH"] = str(Path(tempfile.mkdtemp()) / "trace.jsonl")
+    install(args.backend, args.fixtures, args.llm_latency, args.search_latency)
+
+    counter = _Counter()
+    _count_searches(counter)
+    _count_tokens(counter)
+
+    script, function = FLOWS[flow]
+    script = ROOT / script
+    sys.path[:0] = [str(script.parent), str(ROOT)]
+    run_flow = runpy.run_path(str(script), run_name="bench")[function]
+
+    latencies, errors = [], 0
+    started = time.monotonic()
+    for company in companies:
+        company_started = time.monotonic()
+        try:
+            run_flow(company)
+        except Exception as exc:
+            errors += 1
+            print(f"{flow} failed for {company}: {exc!r}", file=sys.stderr)
+        latencies.append(time.monotonic() - company_started)
+    elapsed = time.monotonic() - started
+
+    return dict(
+        p50_latency_s=float(np.percentile(latencies, 50)),
+        p95_latency_s=float(np.percentile(latencies, 95)),
+        companies_per_min=len(companies) / max(elapsed, 1e-9) * 60,
+        tokens_per_company=counter.tokens / len(companies),
+        searches_per_company=counter.searches / len(companies),
+        # ru_maxrss is in kilobytes on Linux
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        error_rate=errors / len(companies),
+    )
+
+
+def run_benchmarks(flows: List[str], args: argparse.Namespace) -> Dict[str, dict]:
+    results = {}
+    for flow in flows:
+        with tempfile.NamedTemporaryFile(suffix=".json") as out:
+            command = [
+                sys.executable,
+                __file__,
+                "--worker",
+                flow,
+                "--output",
+                out.name,
+                "--backend",
+                args.backend,
+                "--fixtures",
+                str(args.fixtures),
+                "--llm-latency",
+                str(args.llm_latency),
+                "--search-latency",
+                str(args.search_latency),
+            ]
+            proc = subprocess.run(command, capture_output=not args.verbose, text=True)
+            if proc.returncode != 0:
+                print(f"{flow}: worker crashed\n{proc.stderr or ''}", file=sys.stderr)
+                results[flow] = None
+                continue
+            results[flow] = json.loads(Path(out.name).read_text())
+    return results
+
+
+def find_regressions(results: Dict[str, dict], baseline: Dict[str, dict]) -> List[str]:
+    regressions = []
+    for flow, metrics in results.items():
+        if metrics is None:
+            regressions.append(f"{flow}: worker crashed")
+            continue
+        expected = baseline.get(flow)
+        if expected is None:
+            continue
+        for name, tolerance in TOLERANCES.items():
+            value, reference = metrics[name], expected.get(name)
+            if reference is None:
+                continue
+            if name == "error_rate":
+                worse = value > reference + tolerance
+            elif name in HIGHER_IS_BETTER:
+                worse = value < reference * (1 - tolerance)
+            else:
+                worse = value > reference * (1 + tolerance)
+            if worse:
+                regressions.append(
+                    f"{flow}: {name} {value:.3f} vs baseline {reference:.3f} "
+                    f"(tolerance {tolerance:.0%})"
+                )
+    return regressions
+
+
+def format_results(results: Dict[str, dict]) -> str:
+    names = list(TOLERANCES)
+    lines = [f"{'flow':<22}" + "".join(f"{n:>22}" for n in names)]
+    for flow, metrics in results.items():
+        if metrics is None:
+            lines.append(f"{flow:<22}{'crashed':>22}")
+        else:
+            lines.append(f"{flow:<22}" + "".join(f"{metrics[n]:>22.3f}" for n in names))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ICP research flows")
+    parser.add_argument("flows", nargs="*", help=f"any of {', '.join(FLOWS)}")
+    parser.add_argument("--backend", choices=["stub", "replay"], default="stub")
+    parser.add_argument("--fixtures", type=Path, default=ROOT / "find_icp/fixtures")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.0)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the results as the new baseline instead of comparing",
+    )
+    parser.add_argument("--verbose", action="store_true", help="show flow output")
+    parser.add_argument("--worker", choices=list(FLOWS), help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, str(ROOT))
+        metrics = run_worker(args.worker, COMPANIES, args)
+        args.output.write_text(json.dumps(metrics))
+        sys.exit(0)
+
+    unknown = set(args.flows) - set(FLOWS)
+    if unknown:
+        parser.error(f"unknown flows: {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(args.flows or list(FLOWS), args)
+    print(format_results(results))
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+    measured = {k: v for k, v in results.items() if v is not None}
+    if args.update_baseline:
+        baseline.update(measured)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        sys.exit(0)
+
+    # a flow's first measurement becomes its baseline instead of failing the run
+    recorded = {k: v for k, v in measured.items() if k not in baseline}
+    if recorded:
+        baseline.update(recorded)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(
+            f"\nWarning: no baseline for {', '.join(recorded)}; recorded these "
+            f"results in {args.baseline}",
+            file=sys.stderr,
+        )
+
+    regressions = find_regressions(results, baseline)
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(f"  {r}" for r in regressions))
+        sys.exit(1)
+    print("\nNo regressions")
@@ -0,0 +1,108 @@
+import argparse
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List
+
+from main import research_flow
+from my_results_sink import DEFAULT_RESULTS_DIR, ResultsSink
+from my_singleflight import search_flights
+from my_types import RESEARCH_RESULT_TYPES
+
+
+def read_companies(path: Path) -> List[str]:
+    """
+    Read company names from a CSV or JSONL file.
+
+    CSV files need a header row and use the `company` column if present,
+    otherwise the first column.
+    JSONL files use the `company` key of each line.
+    """
+    companies = []
+    if path.suffix == ".jsonl":
+        with path.open() as f:
+            for line in f:
+                if line.strip():
+                    companies.append(json.loads(line)["company"])
+    else:
+        with path.open(newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            column = header.index("company") if "company" in header else 0
+            for row in reader:
+                if row:
+                    companies.append(row[column])
+
+    # keep input order, drop blanks and duplicates
+    return list(dict.fromkeys(c.strip() for c in companies if c.strip()))
+
+
+def run_batch(
+    input_path: Path,
+    results_dir: Path = DEFAULT_RESULTS_DIR,
+    max_workers: int = 4,
+    concurrent: bool = False,
+) -> None:
+    companies = read_companies(input_path)
+    sink = ResultsSink(results_dir, result_types=RESEARCH_RESULT_TYPES)
+    with sink, ThreadPoolExecutor(max_workers) as pool:
+        done = sink.completed_companies()
+        pending = [c for c in companies if c not in done]
+        print(
+            f"{len(companies)} companies, {len(done)} already scored, "
+            f"{len(pending)} to go with {max_workers} workers"
+        )
+
+        started = time.monotonic()
+        finished = 0
+
+        futures = {
+            pool.submit(research_flow, c, concurrent=concurrent): c for c in pending
+        }
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                results, error = future.result(), None
+            except Exception as exc:
+                results, error = None, repr(exc)
+            sink.write(company, results, error=error)
+            finished += 1
+
+            minutes = max(time.monotonic() - started, 1e-9) / 60
+            print(
+                f"[{finished}/{len(pending)}] {company}: {error or 'ok'} "
+                f"({finished / minutes:.1f} companies/min)"
+            )
+
+    stats = search_flights.stats()
+    print(
+        f"Searches: {stats['calls']} upstream, {stats['shared']} shared with "
+        f"an identical in-flight query ({stats['shared_rate']:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a list of companies")
+    parser.add_argument("input", type=Path, help="CSV or JSONL of company names")
+    parser.add_argument(
+        "--results-dir",
+        type=Path,
+        default=DEFAULT_RESULTS_DIR,
+        help="where results are streamed to and resumed from",
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="run the independent research tasks of each company concurrently",
+    )
+    args = parser.parse_args()
+
+    run_batch(
+        args.input,
+        args.results_dir,
+        max_workers=args.workers,
+        concurrent=args.concurrent,
+    )
@@ -1,19 +1,27 @@
 import controlflow as cf
-from my_tools import run_google_search
-from my_types import TotalEmployeeCount, DataStack, ICPScore, DataProfessionalCount
+from my_knowledge_base import knowledge_base, researching
+from my_tools import lookup_knowledge_base, read_top_results, run_google_search
+from my_types import TotalEmployeeCount, DataStack, DataProfessionalCount
 from my_prettify import prettify
+from my_concurrency import run_concurrently
+from my_scoring import score_company
+from my_tracing import install_token_tracing, traced
 
 researcher = cf.Agent(
     "Researcher",
     instructions="""
     You are a company research agent: cross-reference findings, prioritize recent data, cite sources, rate confidence levels, and differentiate between facts and guesses. Adapt your approach based on company specifics and note any biases or limitations in data sources.
+    Check past research with lookup_knowledge_base first and only search the web when it has nothing relevant and recent.
     """,
-    tools=[run_google_search],
+    tools=[lookup_knowledge_base, run_google_search, read_top_results],
 )
 
+install_token_tracing()
 
+
+@traced("flow")
 @cf.flow()
-def research_flow(company_name: str):
+def research_flow(company_name: str, concurrent: bool = False, explain: bool = False):
     total_employee_count_task = cf.Task(
         f"Find the current total employee count for {company_name}",
         agents=[researcher],
@@ -37,23 +45,41 @@ def research_flow(company_name: str):
         """,
     )
 
-    icp_score_task = cf.Task(
-        objective=f"""Determine the Ideal Customer Profile (ICP) score for {company_name} on a scale of 0-100:
-        - Consider the total number of employees, size of the data team, and the company's tech stack.
-        - Higher scores should be given for larger employee counts and data teams.
-        - The tech stack should be evaluated based on the presence of these tools (in order of importance):
-        python, databricks, dbt, snowflake, kubernetes, kafka, openai, aws, gcp, azure, docker.
-        - Combinations of these tools should result in even higher scores.
-        - Provide a final ICP score (0-100) with a breakdown of contributing factors and a brief explanation of the scoring.
-        """,
-        context=dict(
-            employee_count=total_employee_count_task,
-            data_professional_count=data_professional_count_task,
-            data_stack=data_stack_task,
-        ),
-        agents=[researcher],
-        result_type=ICPScore,
+    tasks = dict(
+        employee_count=total_employee_count_task,
+        data_professional_count=data_professional_count_task,
+        data_stack=data_stack_task,
     )
+    # searches made by each task are indexed in the knowledge base under it
+    research = {
+        name: researching(company_name, name)(traced("task", name)(task.run))
+        for name, task in tasks.items()
+    }
+    if concurrent:
+        # the three research tasks don't depend on each other
+        results = run_concurrently(**research)
+    else:
+        results = {name: run() for name, run in research.items()}
+    for name, result in results.items():
+        if result is not None:
+            knowledge_base.add_result(company_name, name, result)
+
+    # the score itself is deterministic; the LLM only explains it, if asked to
+    icp_score = score_company(**results)
+    if explain:
+        explanation_task = cf.Task(
+            objective=f"""Explain the Ideal Customer Profile (ICP) score of {company_name}:
+        - The 0-100 score and its factors are already computed; do not recompute them.
+        - Briefly explain which of the employee count, data team size and tech stack
+        raised or lowered the score, referring to the key tools found.
+        """,
+            context=dict(results, icp_score=icp_score),
+            agents=[researcher],
+            result_type=str,
+        )
+        icp_score.explanation = traced("task", "explanation")(explanation_task.run)()
+
+    return dict(results, icp_score=icp_score)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,25 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+def run_concurrently(**calls: Callable[[], Any]) -> Dict[str, Any]:
+    """
+    Run independent zero-argument callables at the same time and join them.
+
+    Each call runs in its own thread with a copy of the caller's context, so
+    ControlFlow's active flow (a context variable) is visible inside the
+    threads and tasks/subflows attach to the parent flow as usual.
+
+    Args:
+        **calls: Callables keyed by the name their result should have.
+
+    Returns:
+        Dict[str, Any]: The results, keyed like the input.
+    """
+    with ThreadPoolExecutor(max_workers=len(calls) or 1) as pool:
+        futures = {
+            name: pool.submit(contextvars.copy_context().run, call)
+            for name, call in calls.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CACHE_DIR = Path(os.getenv("ICP_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+DEFAULT_EMBEDDINGS_PATH = CACHE_DIR / "embeddings.sqlite3"
+
+# SQLite limits the number of parameters in one statement
+_LOOKUP_CHUNK = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that stores every vector in SQLite, keyed by content hash.
+
+    Texts already embedded with the same model, in this or any earlier run,
+    cost nothing. The remaining texts are deduplicated and sent to `inner` in
+    batches of up to `batch_size`, instead of one request per document.
+
+    Example:
+        ```python
+        embeddings = CachedEmbeddings(OpenAIEmbeddings())
+        Chroma(embedding_function=embeddings, persist_directory="./chroma_db_oai")
+        ```
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        path: Path = DEFAULT_EMBEDDINGS_PATH,
+        namespace: Optional[str] = None,
+        batch_size: int = 512,
+    ):
+        self.inner = inner
+        # vectors from different models must never be mixed up
+        self.namespace = namespace or str(
+            getattr(inner, "model", None) or type(inner).__name__
+        )
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _key(self, text: str, kind: str = "document") -> str:
+        return hashlib.sha256(f"{self.namespace}\0{kind}\0{text}".encode()).hexdigest()
+
+    def _load(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start : start + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT key, vector FROM embeddings "
+                    f"WHERE key IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes())
+                    for key, vector in vectors.items()
+                ],
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = self._load(list(dict.fromkeys(keys)))
+
+        # each distinct missing text is embedded once, however often it repeats
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        self.hits += len(keys) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start : start + self.batch_size]
+            embedded = self.inner.embed_documents([text for _, text in batch])
+            new = {
+                key: np.asarray(vector, dtype=np.float32).tolist()
+                for (key, _), vector in zip(batch, embedded)
+            }
+            self._store(new)
+            vectors.update(new)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        # some models embed queries differently from documents
+        key = self._key(text, kind="query")
+        cached = self._load([key])
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+        self.misses += 1
+        vector = self.inner.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / total if total else 0.0,
+        )
@@ -0,0 +1,238 @@
+import atexit
+import contextvars
+import functools
+import hashlib
+import os
+import queue
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from my_embeddings import CachedEmbeddings
+
+CACHE_DIR = Path(os.getenv("ICP_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+DEFAULT_KB_DIR = CACHE_DIR / "knowledge_base"
+
+# (company, topic) being researched by the current flow or task, so search
+# snippets can be indexed under it without threading it through the tools
+_research_context: contextvars.ContextVar[Tuple[Optional[str], Optional[str]]] = (
+    contextvars.ContextVar("research_context", default=(None, None))
+)
+
+
+@contextmanager
+def researching(company: str, topic: Optional[str] = None) -> Iterator[None]:
+    """
+    Attribute knowledge base entries made in the enclosed block to a company.
+
+    Also usable as a decorator. The context is copied into `run_concurrently`
+    threads like any other context variable.
+    """
+    token = _research_context.set((company, topic))
+    try:
+        yield
+    finally:
+        _research_context.reset(token)
+
+
+class KnowledgeBase:
+    """
+    Past search snippets and validated results, searchable by meaning.
+
+    Entries live in a persistent Chroma collection with `company`, `topic`,
+    `kind` ("snippet" or "result") and `stored_at` metadata. Lookups go
+    across companies on purpose, so research on a parent company or a peer
+    can answer a related one. Entries older than `max_age` are ignored.
+
+    The store is created on first use. Without Chroma or an embeddings
+    backend the knowledge base disables itself and lookups return nothing.
+
+    New entries are queued and indexed by a background thread, up to
+    `batch_size` per embedding request, so research tools never wait for
+    indexing. `flush` waits for the queue; it also runs at exit.
+    """
+
+    def __init__(
+        self,
+        persist_directory: Path = DEFAULT_KB_DIR,
+        collection_name: str = "icp_research",
+        max_age: timedelta = timedelta(days=90),
+        min_relevance: float = 0.75,
+        embedding_function=None,
+        batch_size: int = 64,
+    ):
+        self.persist_directory = Path(persist_directory)
+        self.collection_name = collection_name
+        self.max_age = max_age
+        self.min_relevance = min_relevance
+        self.embedding_function = embedding_function
+        enabled = os.getenv("ICP_KNOWLEDGE_BASE", "1").lower()
+        self.enabled = enabled not in ("0", "false")
+        self.batch_size = batch_size
+        self._store = None
+        # guards creating the store and the indexer only; Chroma and the
+        # embeddings client are safe to use from several threads
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue[Tuple[str, str, dict]]" = queue.Queue()
+        self._indexer: Optional[threading.Thread] = None
+
+    def _vector_store(self):
+        if self._store is not None or not self.enabled:
+            return self._store
+        with self._lock:
+            if self._store is not None or not self.enabled:
+                return self._store
+            try:
+                from langchain_community.vectorstores import Chroma
+                from langchain_openai import OpenAIEmbeddings
+
+                embeddings = self.embedding_function or CachedEmbeddings(
+                    OpenAIEmbeddings()
+                )
+                self._store = Chroma(
+                    collection_name=self.collection_name,
+                    embedding_function=embeddings,
+                    persist_directory=str(self.persist_directory),
+                    collection_metadata={"hnsw:space": "cosine"},
+                )
+            except Exception as exc:
+                warnings.warn(f"knowledge base disabled: {exc!r}")
+                self.enabled = False
+        return self._store
+
+    def _add(self, text: str, company: str, topic: str, kind: str) -> None:
+        if not text or not company or not self.enabled:
+            return
+        # the same text for the same company and topic overwrites itself
+        key = f"{company.lower()}|{topic}|{kind}|{text}"
+        metadata = dict(company=company, topic=topic, kind=kind, stored_at=time.time())
+        self._pending.put((hashlib.sha256(key.encode()).hexdigest(), text, metadata))
+        self._start_indexer()
+
+    def _start_indexer(self) -> None:
+        if self._indexer is not None:
+            return
+        with self._lock:
+            if self._indexer is None:
+                self._indexer = threading.Thread(
+                    target=self._index_forever, name="knowledge-base", daemon=True
+                )
+                self._indexer.start()
+                atexit.register(self.flush)
+
+    def _index_forever(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._index(batch)
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def _index(self, batch: List[Tuple[str, str, dict]]) -> None:
+        store = self._vector_store()
+        if store is None:
+            return
+        # Chroma rejects a batch that repeats an id
+        entries = {id_: (text, metadata) for id_, text, metadata in batch}
+        try:
+            store.add_texts(
+                [text for text, _ in entries.values()],
+                metadatas=[metadata for _, metadata in entries.values()],
+                ids=list(entries),
+            )
+        except Exception as exc:
+            # indexing is best effort and must never fail the research itself
+            warnings.warn(f"could not index {len(entries)} entries: {exc!r}")
+
+    def flush(self) -> None:
+        """Wait until everything added so far is indexed."""
+        if self._indexer is not None:
+            self._pending.join()
+
+    def add_snippet(self, query: str, text: str) -> None:
+        """Index a search result under the company and topic being researched."""
+        self.add_snippets([(query, text)])
+
+    def add_snippets(self, snippets: Iterable[Tuple[str, str]]) -> None:
+        """Index (query or URL, text) pairs like `add_snippet`."""
+        company, topic = _research_context.get()
+        for source, text in snippets:
+            self._add(f"{source}\n{text}", company, topic or "search", "snippet")
+
+    def add_result(self, company: str, topic: str, result: BaseModel) -> None:
+        """Index a validated research result."""
+        self._add(result.model_dump_json(), company, topic, "result")
+
+    def search(self, query: str, k: int = 4, topic: Optional[str] = None) -> List[Dict]:
+        """The `k` most relevant fresh entries, as dicts of text and metadata."""
+        cutoff = time.time() - self.max_age.total_seconds()
+        where = {"stored_at": {"$gte": cutoff}}
+        if topic is not None:
+            where = {"$and": [where, {"topic": topic}]}
+        store = self._vector_store()
+        if store is None:
+            return []
+        try:
+            hits = store.similarity_search_with_relevance_scores(
+                query, k=k, filter=where
+            )
+        except Exception as exc:
+            warnings.warn(f"knowledge base lookup failed: {exc!r}")
+            return []
+        return [
+            dict(text=doc.page_content, relevance=score, **doc.metadata)
+            for doc, score in hits
+            if score >= self.min_relevance
+        ]
+
+
+knowledge_base = KnowledgeBase()
+
+
+def format_hits(hits: List[Dict]) -> str:
+    if not hits:
+        return "No relevant past research found; search the web instead."
+    blocks = []
+    for hit in hits:
+        stored = datetime.fromtimestamp(hit["stored_at"], timezone.utc)
+        blocks.append(
+            f"[{hit['company']} / {hit['topic']} / {hit['kind']}, "
+            f"researched {stored.date().isoformat()}, "
+            f"relevance {hit['relevance']:.2f}]\n{hit['text']}"
+        )
+    return "\n\n".join(blocks)
+
+
+def indexed(topic: str, kb: Optional[KnowledgeBase] = None):
+    """
+    Index what a research flow finds about a company under `topic`.
+
+    The decorated function must take the company name as its first argument.
+    Searches made while it runs are indexed under the company and topic, and
+    a returned Pydantic result is indexed as a validated result.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(company_name: str, *args, **kwargs):
+            with researching(company_name, topic):
+                result = func(company_name, *args, **kwargs)
+            if isinstance(result, BaseModel):
+                (kb or knowledge_base).add_result(company_name, topic, result)
+            return result
+
+        return wrapper
+
+    return decorator
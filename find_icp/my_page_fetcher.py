@@ -0,0 +1,261 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from pydantic import BaseModel
+
+CACHE_DIR = Path(os.getenv("ICP_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+DEFAULT_PAGE_CACHE_PATH = CACHE_DIR / "pages.sqlite3"
+
+USER_AGENT = "Mozilla/5.0 (compatible; icp-research/1.0)"
+
+# tags whose text is never page content
+_SKIPPED_TAGS = {"script", "style", "noscript", "svg", "template", "head"}
+# tags that end a block of text, so words on either side aren't glued together
+_BLOCK_TAGS = set(
+    "p div br li ul ol tr td th table section article header footer "
+    "h1 h2 h3 h4 h5 h6 pre".split()
+)
+
+
+class Page(BaseModel):
+    url: str
+    status: Optional[int] = None
+    text: str = ""
+    from_cache: bool = False
+    error: Optional[str] = None
+
+
+class TextExtractor(HTMLParser):
+    """Incremental HTML-to-text parser: feed it the page as it downloads."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skipping = 0
+        self._parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag in _BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in _BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self._parts.append(data)
+
+    def text(self) -> str:
+        lines = (re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in self._parts)
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(line for line in lines if line))
+
+
+def iter_chunks(text: str, chunk_size: int = 1500, overlap: int = 150) -> Iterator[str]:
+    """
+    Lazily split text into chunks of about `chunk_size` characters.
+
+    Chunks end at a line break where possible, and consecutive chunks share
+    `overlap` characters, so a fact is never cut in half without also
+    appearing whole in the next chunk.
+    """
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_size)
+        if end < len(text):
+            newline = text.rfind("\n", start + chunk_size // 2, end)
+            if newline != -1:
+                end = newline
+        yield text[start:end].strip()
+        if end == len(text):
+            break
+        start = max(end - overlap, start + 1)
+
+
+class PageCache:
+    """Extracted page text with its ETag / Last-Modified validators, in SQLite."""
+
+    def __init__(self, path: Path = DEFAULT_PAGE_CACHE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                text TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, text FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        return dict(zip(("etag", "last_modified", "text"), row)) if row else None
+
+    def put(
+        self, url: str, etag: Optional[str], last_modified: Optional[str], text: str
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, text, time.time()),
+            )
+            self._conn.commit()
+
+
+class PageFetcher:
+    """
+    Fetch many pages concurrently and extract their text.
+
+    One long-lived `httpx.AsyncClient` on a private event loop in a daemon
+    thread serves every call, so keep-alive connections and TLS sessions are
+    reused across calls (and tools) instead of opened per call. At most
+    `max_connections` requests are in flight and `per_host` per host. Bodies
+    are parsed while they stream in and cut off after `max_bytes`. Pages seen
+    before are revalidated with If-None-Match / If-Modified-Since, so an
+    unchanged page costs a 304 instead of a download.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        per_host: int = 2,
+        timeout: float = 10.0,
+        max_bytes: int = 2_000_000,
+        cache: Optional[PageCache] = None,
+    ):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache or PageCache()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        # the loop and client are started on first use, not at import
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, daemon=True)
+                self._thread.start()
+                asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    async def _open(self) -> None:
+        # created on the private loop, which the client and semaphores belong to
+        self._host_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host)
+        )
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=limits,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    async def _fetch(self, url: str) -> Page:
+        cached = self.cache.get(url)
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            async with self._host_limits[urlsplit(url).netloc]:
+                async with self._client.stream(
+                    "GET", url, headers=headers
+                ) as response:
+                    if response.status_code == 304 and cached:
+                        return Page(
+                            url=url, status=304, text=cached["text"], from_cache=True
+                        )
+                    content_type = response.headers.get("content-type", "")
+                    if response.status_code != 200 or "text" not in content_type:
+                        return Page(url=url, status=response.status_code)
+
+                    parser = TextExtractor()
+                    received = 0
+                    async for chunk in response.aiter_text():
+                        parser.feed(chunk)
+                        received += len(chunk)
+                        if received >= self.max_bytes:
+                            break
+                    parser.close()
+                    text = parser.text()
+                    self.cache.put(
+                        url,
+                        response.headers.get("etag"),
+                        response.headers.get("last-modified"),
+                        text,
+                    )
+                    return Page(url=url, status=200, text=text)
+        except httpx.HTTPError as exc:
+            return Page(url=url, error=repr(exc))
+
+    async def _fetch_all(self, urls: List[str]) -> List[Page]:
+        return await asyncio.gather(*(self._fetch(url) for url in urls))
+
+    def _submit(self, urls: Iterable[str]):
+        urls = list(dict.fromkeys(urls))
+        return asyncio.run_coroutine_threadsafe(self._fetch_all(urls), self._start())
+
+    async def fetch_many(self, urls: Iterable[str]) -> List[Page]:
+        """Fetch pages from any event loop, on the fetcher's own client."""
+        return await asyncio.wrap_future(self._submit(urls))
+
+    def fetch(self, urls: Iterable[str]) -> List[Page]:
+        """Blocking `fetch_many`, safe to call from sync tools in any thread."""
+        return self._submit(urls).result()
+
+    def close(self) -> None:
+        with self._start_lock:
+            if self._loop is None:
+                return
+            loop, self._loop = self._loop, None
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+
+page_fetcher = PageFetcher()
+
+
+def relevant_chunks(text: str, query: str, limit: int = 2, **chunking) -> List[str]:
+    """The `limit` chunks of `text` that mention the most query terms, in order."""
+    terms = {t for t in re.findall(r"\w+", query.lower()) if len(t) > 2}
+    scored = [
+        (sum(term in chunk.lower() for term in terms), i, chunk)
+        for i, chunk in enumerate(iter_chunks(text, **chunking))
+    ]
+    best = sorted(scored, key=lambda s: (-s[0], s[1]))[:limit]
+    return [chunk for _, _, chunk in sorted(best, key=lambda s: s[1])]
@@ -0,0 +1,180 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+from zoneinfo import ZoneInfo
+
+CACHE_DIR = Path(os.getenv("ICP_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+DEFAULT_STATE_PATH = CACHE_DIR / "rate_limit.sqlite3"
+
+# the Custom Search daily quota resets at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    """Pull an HTTP status out of googleapiclient / requests / httpx errors."""
+    resp = getattr(exc, "resp", None) or getattr(exc, "response", None)
+    status = getattr(resp, "status", None) or getattr(resp, "status_code", None)
+    return int(status) if status is not None else None
+
+
+class RateLimiter:
+    """
+    Token bucket plus daily quota, shared by every thread and process on a host.
+
+    The bucket state lives in a small SQLite file and is updated inside
+    `BEGIN IMMEDIATE` transactions, so concurrent workers draw from the same
+    `rate` tokens per second (bursting up to `burst`) and the same `daily_quota`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        daily_quota: Optional[int] = None,
+        burst: Optional[float] = None,
+        path: Path = DEFAULT_STATE_PATH,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        on_retry: Optional[Callable[[], None]] = None,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst or rate
+        self.daily_quota = daily_quota
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retries = 0
+        self.on_retry = on_retry
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS quotas (
+                name TEXT NOT NULL, day TEXT NOT NULL, used INTEGER NOT NULL,
+                PRIMARY KEY (name, day)
+            );
+            CREATE TABLE IF NOT EXISTS calls (name TEXT NOT NULL, ts REAL NOT NULL);
+            """
+        )
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+    def _try_acquire(self) -> float:
+        """Take a token if one is available; otherwise return seconds to wait."""
+        now = time.time()
+        day = self._today()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE name = ?",
+                    (self.name,),
+                ).fetchone()
+                tokens, updated_at = row if row else (self.burst, now)
+                tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+                used = self._conn.execute(
+                    "SELECT used FROM quotas WHERE name = ? AND day = ?",
+                    (self.name, day),
+                ).fetchone()
+                used = used[0] if used else 0
+                if self.daily_quota is not None and used >= self.daily_quota:
+                    raise QuotaExceeded(
+                        f"daily quota of {self.daily_quota} {self.name} calls used up"
+                    )
+
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO quotas VALUES (?, ?, ?)",
+                        (self.name, day, used + 1),
+                    )
+                    self._conn.execute(
+                        "INSERT INTO calls VALUES (?, ?)", (self.name, now)
+                    )
+                    self._conn.execute(
+                        "DELETE FROM calls WHERE name = ? AND ts < ?",
+                        (self.name, now - 60),
+                    )
+                else:
+                    wait = (1 - tokens) / self.rate
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                    (self.name, tokens, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self) -> None:
+        """Block until a token is available, raising QuotaExceeded past the quota."""
+        while (wait := self._try_acquire()) > 0:
+            time.sleep(wait)
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Call `func` under the rate limit, retrying 429 and 5xx errors.
+
+        Retries back off exponentially with full jitter, so workers that were
+        throttled together don't retry in lockstep.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            try:
+                return func(*args, **kwargs)
+            except Exception as exc:
+                status = _status_code(exc)
+                retryable = status == 429 or (status is not None and status >= 500)
+                if not retryable or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                if self.on_retry is not None:
+                    self.on_retry()
+                delay = min(self.backoff_cap, self.backoff_base * 2**attempt)
+                time.sleep(random.uniform(0, delay))
+
+    def metrics(self) -> dict:
+        """Calls per second over the last minute and today's remaining quota."""
+        now = time.time()
+        with self._lock:
+            recent = self._conn.execute(
+                "SELECT COUNT(*) FROM calls WHERE name = ? AND ts >= ?",
+                (self.name, now - 60),
+            ).fetchone()[0]
+            used = self._conn.execute(
+                "SELECT used FROM quotas WHERE name = ? AND day = ?",
+                (self.name, self._today()),
+            ).fetchone()
+        used = used[0] if used else 0
+        return dict(
+            current_rate=recent / 60,
+            used_today=used,
+            remaining_quota=(
+                self.daily_quota - used if self.daily_quota is not None else None
+            ),
+            retries=self.retries,
+        )
@@ -0,0 +1,382 @@
+"""
+Record live LLM and Google search responses once, then replay them offline.
+
+Run any flow script under the harness:
+
+    # with real OPENAI / GOOGLE keys, saves every response under fixtures/
+    python find_icp/my_replay.py record find_icp/main.py
+
+    # no network or keys needed, 200 ms synthetic latency per LLM call
+    python find_icp/my_replay.py --llm-latency 0.2 replay find_icp/main.py
+
+The `stub` mode needs no fixtures at all: the model searches once per turn and
+then completes its task with placeholder values that satisfy the result type.
+
+Requests are keyed by a hash of their content with run-specific ids and
+timestamps masked, so replays are deterministic across runs and machines.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import runpy
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    ToolMessage,
+    message_to_dict,
+    messages_from_dict,
+    messages_to_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+DEFAULT_FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# uuids, hex ids, tool call ids and timestamps differ between otherwise
+# identical runs, so they are masked before hashing a request
+_VOLATILE = [
+    (re.compile(r"\b[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{8,}\b"), "<hex>"),
+    (re.compile(r"\bcall_[A-Za-z0-9]+\b"), "<call_id>"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}[\d.:+Z-]*"), "<ts>"),
+]
+
+
+class FixtureMissing(KeyError):
+    pass
+
+
+class FixtureStore:
+    """Recorded responses, one JSON file per request under `root/<kind>/`."""
+
+    def __init__(self, root: Path = DEFAULT_FIXTURES_DIR, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', not {mode!r}")
+        self.root = Path(root)
+        self.mode = mode
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request: Any) -> str:
+        text = json.dumps(request, sort_keys=True, default=str)
+        for pattern, replacement in _VOLATILE:
+            text = pattern.sub(replacement, text)
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def _path(self, kind: str, request: Any) -> Path:
+        return self.root / kind / f"{self.key(request)}.json"
+
+    def load(self, kind: str, request: Any) -> Any:
+        path = self._path(kind, request)
+        if not path.exists():
+            raise FixtureMissing(
+                f"no recorded {kind} response for this request ({path.name}); "
+                "record it first"
+            )
+        return json.loads(path.read_text())["response"]
+
+    def save(self, kind: str, request: Any, response: Any) -> None:
+        path = self._path(kind, request)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            record = dict(request=request, response=response)
+            path.write_text(json.dumps(record, indent=2, default=str))
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model that records the responses of `inner`, or replays recorded ones.
+
+    In replay mode every call sleeps `latency` seconds before answering, so
+    throughput numbers include a realistic, fixed model latency.
+    """
+
+    store: Any
+    inner: Optional[BaseChatModel] = None
+    latency: float = 0.0
+    tools: List[Any] = []
+    tool_kwargs: dict = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools, **kwargs) -> "ReplayChatModel":
+        return self.model_copy(update=dict(tools=list(tools), tool_kwargs=kwargs))
+
+    def _generate(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs
+    ) -> ChatResult:
+        request = dict(
+            messages=messages_to_dict(messages),
+            tools=[convert_to_openai_tool(t) for t in self.tools],
+            stop=stop,
+        )
+        if self.store.mode == "record":
+            model = self.inner
+            if self.tools:
+                model = model.bind_tools(self.tools, **self.tool_kwargs)
+            message = model.invoke(messages, stop=stop)
+            self.store.save("llm", request, message_to_dict(message))
+        else:
+            time.sleep(self.latency)
+            message = messages_from_dict([self.store.load("llm", request)])[0]
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model that needs no recorded data, for benchmarks and smoke tests.
+
+    Each turn it calls the first search tool once, then marks every task it
+    was given as successful, with placeholder values generated from the
+    result schema. Token usage is estimated at ~4 characters per token.
+    """
+
+    latency: float = 0.0
+    tools: List[Any] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs) -> "StubChatModel":
+        return self.model_copy(update=dict(tools=list(tools)))
+
+    def _generate(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        specs = [convert_to_openai_tool(t)["function"] for t in self.tools]
+        search = next((s for s in specs if "search" in s["name"].lower()), None)
+        finish = [
+            s
+            for s in specs
+            if s["name"].startswith("mark_task_") and s["name"].endswith("_successful")
+        ]
+
+        if search is not None and _last_tool_called(messages) != search["name"]:
+            query = str(messages[-1].content)[:100] if messages else "company"
+            calls = [(search, {"query": query})]
+        else:
+            calls = [(s, _example(s.get("parameters", {}))) for s in finish]
+
+        message = AIMessage(
+            content="",
+            tool_calls=[
+                dict(name=spec["name"], args=args, id=f"call_stub{i}")
+                for i, (spec, args) in enumerate(calls)
+            ],
+        )
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = len(json.dumps([args for _, args in calls])) // 4
+        message.usage_metadata = dict(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _last_tool_called(messages: List[BaseMessage]) -> Optional[str]:
+    """Name of the tool whose result is the last message, if it is one."""
+    if not messages or not isinstance(messages[-1], ToolMessage):
+        return None
+    for message in reversed(messages):
+        for call in getattr(message, "tool_calls", None) or []:
+            if call["id"] == messages[-1].tool_call_id:
+                return call["name"]
+    return None
+
+
+def _example(schema: dict, defs: Optional[dict] = None) -> Any:
+    """A placeholder value that validates against a JSON schema."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return _example(defs[schema["$ref"].split("/")[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [o for o in schema[key] if o.get("type") != "null"]
+            return _example(options[0] if options else {}, defs)
+    kind = schema.get("type")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {name: _example(sub, defs) for name, sub in properties.items()}
+    if kind == "array":
+        return []
+    if kind in ("integer", "number"):
+        value = min(max(100, schema.get("minimum", 100)), schema.get("maximum", 100))
+        return value if kind == "number" else int(value)
+    if kind == "boolean":
+        return True
+    return "stub"
+
+
+def replayable(
+    func: Callable, store: FixtureStore, kind: str, latency: float = 0.0
+) -> Callable:
+    """Record or replay a function with JSON serializable arguments and result."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # drop `self` so bound and unbound calls share fixtures
+        request = dict(args=[a for a in args if _is_plain(a)], kwargs=kwargs)
+        if store.mode == "record":
+            response = func(*args, **kwargs)
+            store.save(kind, request, response)
+            return response
+        time.sleep(latency)
+        return store.load(kind, request)
+
+    return wrapper
+
+
+def _is_plain(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool, type(None), list, dict))
+
+
+def _stub_search(latency: float) -> Callable:
+    def run(self, query: str, **kwargs) -> str:
+        time.sleep(latency)
+        return f"Stub search result for {query!r}: about 100 employees use python."
+
+    return run
+
+
+def _stub_results(latency: float) -> Callable:
+    def results(self, query: str, num_results: int, **kwargs) -> List[dict]:
+        time.sleep(latency)
+        return [
+            dict(
+                title=f"Stub result {i} for {query}",
+                link=f"https://example.com/{i}",
+                snippet="about 100 employees use python",
+            )
+            for i in range(num_results)
+        ]
+
+    return results
+
+
+def _stub_fetch(latency: float) -> Callable:
+    from my_page_fetcher import Page
+
+    def fetch(self, urls) -> list:
+        time.sleep(latency)
+        return [
+            Page(url=url, status=200, text="About 100 employees, hiring data engineers")
+            for url in dict.fromkeys(urls)
+        ]
+
+    return fetch
+
+
+def _replayable_fetch(original: Callable, store: FixtureStore, latency: float):
+    from my_page_fetcher import Page
+
+    @functools.wraps(original)
+    def fetch(self, urls) -> list:
+        request = dict(urls=list(dict.fromkeys(urls)))
+        if store.mode == "record":
+            pages = original(self, request["urls"])
+            store.save("pages", request, [page.model_dump() for page in pages])
+            return pages
+        time.sleep(latency)
+        return [Page(**page) for page in store.load("pages", request)]
+
+    return fetch
+
+
+def install(
+    mode: str,
+    fixtures_dir: Path = DEFAULT_FIXTURES_DIR,
+    llm_latency: float = 0.0,
+    search_latency: float = 0.0,
+) -> Optional[FixtureStore]:
+    """
+    Route ControlFlow's default model, Google searches and page fetches
+    through fixtures.
+
+    `mode` is "record", "replay" or "stub". Call this before the flow modules
+    are imported, so search tools built at import time pick up the patched
+    `GoogleSearchAPIWrapper`.
+    """
+    if mode in ("replay", "stub"):
+        # nothing talks to the real services, but the clients want keys to exist
+        for name in ("OPENAI_API_KEY", "GOOGLE_API_KEY", "GOOGLE_CSE_ID"):
+            os.environ.setdefault(name, "replay")
+        # knowledge base lookups would need a live embeddings API
+        os.environ.setdefault("ICP_KNOWLEDGE_BASE", "0")
+    # keep the search cache, rate limiter and result store out of the way so
+    # every request reaches the fixtures and real caches aren't touched
+    os.environ["ICP_CACHE_DIR"] = tempfile.mkdtemp(prefix="icp-replay-")
+
+    import controlflow as cf
+    from langchain_google_community import GoogleSearchAPIWrapper
+
+    # the flows import their helpers as top-level modules
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from my_page_fetcher import PageFetcher
+
+    if mode == "stub":
+        cf.defaults.model = StubChatModel(latency=llm_latency)
+        GoogleSearchAPIWrapper.run = _stub_search(search_latency)
+        GoogleSearchAPIWrapper.results = _stub_results(search_latency)
+        PageFetcher.fetch = _stub_fetch(search_latency)
+        return None
+
+    store = FixtureStore(fixtures_dir, mode)
+    previous = cf.defaults.model
+    if mode == "record" and previous is None:
+        raise ValueError("recording needs a working default model (OPENAI_API_KEY)")
+    cf.defaults.model = ReplayChatModel(
+        store=store,
+        inner=previous,
+        latency=llm_latency,
+        callbacks=getattr(previous, "callbacks", None),
+    )
+    for method in ("run", "results"):
+        original = getattr(GoogleSearchAPIWrapper, method)
+        setattr(
+            GoogleSearchAPIWrapper,
+            method,
+            replayable(original, store, f"search_{method}", search_latency),
+        )
+    PageFetcher.fetch = _replayable_fetch(PageFetcher.fetch, store, search_latency)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay a flow script")
+    parser.add_argument("mode", choices=["record", "replay", "stub"])
+    parser.add_argument("script", type=Path)
+    parser.add_argument("script_args", nargs=argparse.REMAINDER)
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    install(args.mode, args.fixtures, args.llm_latency, args.search_latency)
+
+    # run the script as if it was started directly, with the repo root
+    # importable for the cross-directory imports
+    sys.path[:0] = [
+        str(args.script.resolve().parent),
+        str(Path(__file__).resolve().parents[1]),
+    ]
+    sys.argv = [str(args.script), *args.script_args]
+    runpy.run_path(str(args.script), run_name="__main__")
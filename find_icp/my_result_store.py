@@ -0,0 +1,118 @@
+import functools
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from my_types import DataProfessionalCount, DataStack, TotalEmployeeCount
+
+CACHE_DIR = Path(os.getenv("ICP_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+DEFAULT_STORE_PATH = CACHE_DIR / "results.sqlite3"
+
+# How long a researched result stays fresh, per result type. Headcounts move
+# slowly; tech stacks change more often.
+FRESHNESS: Dict[str, timedelta] = {
+    TotalEmployeeCount.__name__: timedelta(days=90),
+    DataProfessionalCount.__name__: timedelta(days=90),
+    DataStack.__name__: timedelta(days=30),
+}
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def normalize_company(company_name: str) -> str:
+    return " ".join(company_name.split()).lower()
+
+
+class ResultStore:
+    """Validated Pydantic results per company and result type, stored in SQLite."""
+
+    def __init__(self, path: Path = DEFAULT_STORE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                company TEXT NOT NULL,
+                result_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (company, result_type)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(
+        self, company_name: str, result_type: Type[M], max_age: timedelta
+    ) -> Optional[M]:
+        """Return the stored result if it is younger than `max_age`."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM results "
+                "WHERE company = ? AND result_type = ? AND stored_at > ?",
+                (
+                    normalize_company(company_name),
+                    result_type.__name__,
+                    time.time() - max_age.total_seconds(),
+                ),
+            ).fetchone()
+        return result_type.model_validate_json(row[0]) if row else None
+
+    def put(self, company_name: str, result: BaseModel) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (
+                    normalize_company(company_name),
+                    type(result).__name__,
+                    result.model_dump_json(),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+
+result_store = ResultStore()
+
+
+def memoized_result(
+    result_type: Type[M],
+    max_age: Optional[timedelta] = None,
+    store: Optional[ResultStore] = None,
+    on_hit: Optional[Callable[[], None]] = None,
+):
+    """
+    Reuse a flow's result for a company while it is still fresh.
+
+    The decorated function must take the company name as its first argument
+    and return a `result_type` instance. Fresh results skip the call (and its
+    LLM round trips) entirely; pass `refresh=True` to force a new one.
+    `on_hit` is called whenever a stored result is reused.
+    """
+    max_age = max_age or FRESHNESS[result_type.__name__]
+
+    def decorator(func: Callable[..., M]) -> Callable[..., M]:
+        @functools.wraps(func)
+        def wrapper(company_name: str, *args, refresh: bool = False, **kwargs) -> M:
+            results = store or result_store
+            if not refresh:
+                cached = results.get(company_name, result_type, max_age)
+                if cached is not None:
+                    if on_hit is not None:
+                        on_hit()
+                    return cached
+            result = func(company_name, *args, **kwargs)
+            if isinstance(result, result_type):
+                results.put(company_name, result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,174 @@
+import json
+import threading
+import time
+import types
+import typing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Type
+
+import pandas as pd
+from pydantic import BaseModel
+
+DEFAULT_RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+class ResultsSink:
+    """
+    Stream per-company results to disk as they complete.
+
+    Rows are appended to `active.jsonl` and flushed immediately. Every
+    `compact_every` rows (and on close) the active file is rotated and compacted
+    into Parquet partitioned by run date, with result fields flattened into
+    columns such as `employee_count.employee_count`; lists and dicts inside a
+    result (sources, roles, ...) are stored as JSON strings:
+
+        results/
+            active.jsonl
+            parquet/run_date=2024-07-01/part-<segment>.parquet
+
+    Example:
+        ```python
+        with ResultsSink() as sink:
+            sink.write("Blackstone", research_flow("Blackstone"))
+        ```
+
+    With `result_types` (result name -> model, e.g. `RESEARCH_RESULT_TYPES`)
+    every part gets the same columns and column types, whether its rows are
+    errors or results, so the partitions read as one dataset.
+    """
+
+    def __init__(
+        self,
+        root: Path = DEFAULT_RESULTS_DIR,
+        compact_every: int = 1000,
+        result_types: Optional[Dict[str, Type[BaseModel]]] = None,
+    ):
+        self.root = Path(root)
+        self.compact_every = compact_every
+        self.columns = _columns(result_types) if result_types else None
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._rows_since_compaction = 0
+        self._active = (self.root / "active.jsonl").open("a")
+
+    def __enter__(self) -> "ResultsSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(
+        self,
+        company: str,
+        results: Optional[Dict[str, Optional[BaseModel]]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        now = datetime.now(timezone.utc)
+        row = dict(
+            company=company,
+            run_date=now.date().isoformat(),
+            completed_at=now.isoformat(),
+            status="error" if error else "ok",
+            error=error,
+        )
+        for name, result in (results or {}).items():
+            row[name] = result.model_dump() if result is not None else None
+
+        with self._lock:
+            self._active.write(json.dumps(row) + "\n")
+            self._active.flush()
+            self._rows_since_compaction += 1
+            should_compact = self._rows_since_compaction >= self.compact_every
+        if should_compact:
+            self.compact()
+
+    def _rotate(self) -> None:
+        with self._lock:
+            self._active.close()
+            active = self.root / "active.jsonl"
+            if active.exists() and active.stat().st_size:
+                active.rename(self.root / f"compacting-{time.time_ns()}.jsonl")
+            self._active = active.open("a")
+            self._rows_since_compaction = 0
+
+    def compact(self) -> None:
+        """Move everything written so far into the Parquet partitions."""
+        with self._compact_lock:
+            self._rotate()
+            # segments left behind by a crashed compaction are picked up here too
+            for segment in sorted(self.root.glob("compacting-*.jsonl")):
+                self._compact_segment(segment)
+
+    def _compact_segment(self, segment: Path) -> None:
+        rows = list(_read_jsonl(segment))
+        if rows:
+            # one level only: a result's own dicts (roles, ...) must not turn
+            # into a column per key
+            df = pd.json_normalize(rows, max_level=1)
+            for column in df.columns:
+                df[column] = df[column].map(
+                    lambda v: json.dumps(v) if isinstance(v, (list, dict)) else v
+                )
+            if self.columns:
+                df = df.reindex(columns=list(self.columns)).astype(self.columns)
+            for run_date, partition in df.groupby("run_date"):
+                path = self.root / "parquet" / f"run_date={run_date}"
+                path.mkdir(parents=True, exist_ok=True)
+                # named after the segment, so redoing a crashed compaction overwrites
+                partition.drop(columns="run_date").to_parquet(
+                    path / f"part-{segment.stem}.parquet", index=False
+                )
+        segment.unlink()
+
+    def completed_companies(self) -> Set[str]:
+        """Companies with a successful row in any JSONL segment or Parquet file."""
+        companies = set()
+        for segment in self.root.glob("*.jsonl"):
+            companies.update(
+                row["company"] for row in _read_jsonl(segment) if row["status"] == "ok"
+            )
+        for part in self.root.glob("parquet/run_date=*/*.parquet"):
+            df = pd.read_parquet(part, columns=["company", "status"])
+            companies.update(df.loc[df["status"] == "ok", "company"])
+        return companies
+
+    def close(self) -> None:
+        self.compact()
+        self._active.close()
+
+
+def _columns(result_types: Dict[str, Type[BaseModel]]) -> Dict[str, str]:
+    """Column -> dtype of a compacted row."""
+    columns = dict.fromkeys(
+        ["company", "run_date", "completed_at", "status", "error"], "string"
+    )
+    for name, model in result_types.items():
+        for field, info in model.model_fields.items():
+            columns[f"{name}.{field}"] = _dtype(info.annotation)
+    return columns
+
+
+def _dtype(annotation) -> str:
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = {a for a in typing.get_args(annotation) if a is not type(None)}
+    else:
+        args = {annotation}
+    # float even for ints, so a part where they are all missing matches
+    if args and args <= {int, float}:
+        return "float64"
+    if args == {bool}:
+        return "boolean"
+    # strings, and lists / dicts as JSON
+    return "string"
+
+
+def _read_jsonl(path: Path) -> Iterator[dict]:
+    with path.open() as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # a crash can leave a half-written last line behind
+                continue
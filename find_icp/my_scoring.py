@@ -0,0 +1,147 @@
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from my_types import DataProfessionalCount, DataStack, ICPScore, TotalEmployeeCount
+
+# Tools that matter for the ICP, most important first
+TOOL_RANKING = [
+    "python",
+    "databricks",
+    "dbt",
+    "snowflake",
+    "kubernetes",
+    "kafka",
+    "openai",
+    "aws",
+    "gcp",
+    "azure",
+    "docker",
+]
+
+# Other spellings the researcher tends to report for the same tool
+TOOL_ALIASES = {
+    "kubernetes": ["k8s"],
+    "openai": ["gpt"],
+    "aws": ["amazon web services"],
+    "gcp": ["google cloud"],
+}
+
+# Importance falls off linearly with rank; weights sum to 1
+TOOL_WEIGHTS = np.linspace(1.0, 0.2, len(TOOL_RANKING))
+TOOL_WEIGHTS /= TOOL_WEIGHTS.sum()
+
+# Share of the final score contributed by each factor
+FACTOR_WEIGHTS = dict(employee=0.3, data_team=0.3, tech_stack=0.4)
+
+# Sizes at which the employee and data team factors reach 1 (log scale)
+EMPLOYEE_SATURATION = 100_000
+DATA_TEAM_SATURATION = 1_000
+
+# Extra tech stack credit per additional ranked tool, for tool combinations
+COMBINATION_BONUS = 0.05
+
+_TOOL_PATTERNS = [
+    re.compile(r"\b(%s)\b" % "|".join(map(re.escape, [t, *TOOL_ALIASES.get(t, [])])))
+    for t in TOOL_RANKING
+]
+
+
+def tool_matrix(stacks: Sequence[Optional[DataStack]]) -> np.ndarray:
+    """Boolean (companies x TOOL_RANKING) matrix of the ranked tools each uses."""
+    matrix = np.zeros((len(stacks), len(TOOL_RANKING)), dtype=bool)
+    for row, stack in enumerate(stacks):
+        if stack is None:
+            continue
+        text = " ".join(stack.tools + stack.primary_languages).lower()
+        for column, pattern in enumerate(_TOOL_PATTERNS):
+            matrix[row, column] = bool(pattern.search(text))
+    return matrix
+
+
+def _log_factor(counts: np.ndarray, saturation: int) -> np.ndarray:
+    # missing counts are NaN and score 0
+    counts = np.nan_to_num(np.asarray(counts, dtype=float), nan=0.0)
+    return np.clip(np.log1p(np.maximum(counts, 0)) / np.log1p(saturation), 0, 1)
+
+
+def score_arrays(
+    employee_counts: np.ndarray,
+    data_team_counts: np.ndarray,
+    tools: np.ndarray,
+    tool_weights: np.ndarray = TOOL_WEIGHTS,
+    factor_weights: Dict[str, float] = FACTOR_WEIGHTS,
+) -> Dict[str, np.ndarray]:
+    """
+    Score a whole batch of companies at once.
+
+    Args:
+        employee_counts (np.ndarray): Total employees per company, NaN if unknown.
+        data_team_counts (np.ndarray): Data professionals per company, NaN if unknown.
+        tools (np.ndarray): Boolean matrix from `tool_matrix`.
+        tool_weights (np.ndarray): Weight of each tool in TOOL_RANKING.
+        factor_weights (Dict[str, float]): Weight of each factor in the score.
+
+    Returns:
+        Dict[str, np.ndarray]: `score` (0-100 ints) and the three factors (0-1).
+    """
+    employee_factor = _log_factor(employee_counts, EMPLOYEE_SATURATION)
+    data_team_factor = _log_factor(data_team_counts, DATA_TEAM_SATURATION)
+
+    tools = np.asarray(tools, dtype=bool)
+    extra_tools = np.maximum(tools.sum(axis=1) - 1, 0)
+    tech_stack_factor = np.clip(
+        tools @ tool_weights + COMBINATION_BONUS * extra_tools, 0, 1
+    )
+
+    score = (
+        factor_weights["employee"] * employee_factor
+        + factor_weights["data_team"] * data_team_factor
+        + factor_weights["tech_stack"] * tech_stack_factor
+    ) / sum(factor_weights.values())
+
+    return dict(
+        score=np.rint(score * 100).astype(int),
+        employee_factor=employee_factor,
+        data_team_factor=data_team_factor,
+        tech_stack_factor=tech_stack_factor,
+    )
+
+
+def score_batch(
+    employee_counts: Sequence[Optional[TotalEmployeeCount]],
+    data_professional_counts: Sequence[Optional[DataProfessionalCount]],
+    data_stacks: Sequence[Optional[DataStack]],
+) -> List[ICPScore]:
+    """Compute an ICPScore per company from the three upstream research results."""
+
+    def counts(models, field):
+        values = [getattr(m, field, None) for m in models]
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+    tools = tool_matrix(data_stacks)
+    scores = score_arrays(
+        counts(employee_counts, "employee_count"),
+        counts(data_professional_counts, "data_professional_count"),
+        tools,
+    )
+
+    return [
+        ICPScore(
+            score=int(scores["score"][i]),
+            employee_factor=float(scores["employee_factor"][i]),
+            data_team_factor=float(scores["data_team_factor"][i]),
+            tech_stack_factor=float(scores["tech_stack_factor"][i]),
+            key_tools=[t for t, used in zip(TOOL_RANKING, tools[i]) if used],
+        )
+        for i in range(len(tools))
+    ]
+
+
+def score_company(
+    employee_count: Optional[TotalEmployeeCount],
+    data_professional_count: Optional[DataProfessionalCount],
+    data_stack: Optional[DataStack],
+) -> ICPScore:
+    return score_batch([employee_count], [data_professional_count], [data_stack])[0]
@@ -0,0 +1,162 @@
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+CACHE_DIR = Path(os.getenv("ICP_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+DEFAULT_CACHE_PATH = CACHE_DIR / "search_cache.sqlite3"
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so near-identical queries share a key."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class SearchCache:
+    """
+    On-disk cache of search results, stored in SQLite.
+
+    Entries expire after `ttl_seconds` and the least recently used entries are
+    evicted once the cache holds more than `max_entries`. Values must be JSON
+    serializable. Setting `bypass` (or the SEARCH_CACHE_BYPASS environment
+    variable) skips lookups so fresh results are fetched, while still storing
+    them for later runs.
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = 7 * 24 * 60 * 60,
+        max_entries: int = 50_000,
+        bypass: Optional[bool] = None,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        if bypass is None:
+            bypass = os.getenv("SEARCH_CACHE_BYPASS", "").lower() in ("1", "true")
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _index(self) -> sqlite3.Connection:
+        # opened on first use, so importing the tools never touches the disk
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    namespace TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, query)
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, namespace: str, query: str) -> Optional[Any]:
+        if self.bypass:
+            return None
+        now = time.time()
+        with self._lock:
+            conn = self._index()
+            row = conn.execute(
+                "SELECT value FROM search_cache "
+                "WHERE namespace = ? AND query = ? AND created_at > ?",
+                (namespace, normalize_query(query), now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE search_cache SET accessed_at = ? "
+                "WHERE namespace = ? AND query = ?",
+                (now, namespace, normalize_query(query)),
+            )
+            conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, namespace: str, query: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._index()
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?)",
+                (namespace, normalize_query(query), json.dumps(value), now, now),
+            )
+            # drop expired rows, then the least recently used ones over the limit
+            conn.execute(
+                "DELETE FROM search_cache WHERE created_at <= ?",
+                (now - self.ttl_seconds,),
+            )
+            conn.execute(
+                "DELETE FROM search_cache WHERE rowid IN ("
+                "SELECT rowid FROM search_cache ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / total if total else 0.0,
+        )
+
+
+search_cache = SearchCache()
+
+
+def cached_search(
+    func: Optional[Callable] = None,
+    *,
+    cache: Optional[SearchCache] = None,
+    namespace: Optional[str] = None,
+    on_hit: Optional[Callable[[], None]] = None,
+):
+    """
+    Cache a search function that takes the query as its first argument.
+
+    Results are keyed by the normalized query only, within `namespace`.
+    Results that are None are not cached, so failed lookups are retried.
+    Pass `bypass=True` to the wrapped function to force a fresh search.
+    `on_hit` is called whenever a result is served from the cache.
+    """
+    if func is None:
+        return functools.partial(
+            cached_search, cache=cache, namespace=namespace, on_hit=on_hit
+        )
+
+    namespace = namespace or f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(query: str, *args, bypass: bool = False, **kwargs):
+        store = cache or search_cache
+        if not bypass:
+            result = store.get(namespace, query)
+            if result is not None:
+                if on_hit is not None:
+                    on_hit()
+                return result
+        result = func(query, *args, **kwargs)
+        if result is not None:
+            store.set(namespace, query, result)
+        return result
+
+    return wrapper
@@ -0,0 +1,99 @@
+import functools
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from my_search_cache import normalize_query
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Share one in-flight call among concurrent callers asking for the same key.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for it and get the same result (or exception). Once the
+    call finishes the key is forgotten, so later callers run it again (or, in
+    front of a cache, find the stored result).
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _Call] = {}
+
+    def do(self, key: str, func: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """Return the result for `key` and whether it came from another caller."""
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result, False
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        total = self.calls + self.shared
+        return dict(
+            calls=self.calls,
+            shared=self.shared,
+            shared_rate=self.shared / total if total else 0.0,
+        )
+
+
+search_flights = SingleFlight()
+
+
+def coalesced(
+    func: Optional[Callable] = None,
+    *,
+    group: Optional[SingleFlight] = None,
+    on_shared: Optional[Callable[[], None]] = None,
+):
+    """
+    Coalesce concurrent calls of a search function with equivalent queries.
+
+    Queries are compared after `normalize_query`, the same key the search
+    cache uses, so "Snowflake adoption  banks" and "snowflake adoption banks"
+    issued by two flows at once make one upstream request. `on_shared` is
+    called for every caller that reused another caller's request.
+    """
+    if func is None:
+        return functools.partial(coalesced, group=group, on_shared=on_shared)
+
+    namespace = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(query: str, *args, **kwargs):
+        flights = group or search_flights
+        key = f"{namespace}:{normalize_query(query)}"
+        result, shared = flights.do(key, func, query, *args, **kwargs)
+        if shared and on_shared is not None:
+            on_shared()
+        return result
+
+    return wrapper
@@ -3,6 +3,14 @@ from langchain_core.tools import Tool
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
+from functools import partial
+from typing import List
+from my_knowledge_base import format_hits, knowledge_base
+from my_page_fetcher import page_fetcher, relevant_chunks
+from my_search_cache import cached_search
+from my_rate_limit import RateLimiter
+from my_singleflight import coalesced
+from my_tracing import record, traced
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,7 +22,61 @@ google_search = GoogleSearchAPIWrapper(
     google_api_key=google_api_key, google_cse_id=google_cse_id
 )
 
+# Shared by every worker on this host so parallel flows stay inside the CSE quota
+search_rate_limiter = RateLimiter(
+    "google_search",
+    rate=float(os.getenv("GOOGLE_SEARCH_QPS", "100")),
+    daily_quota=int(os.getenv("GOOGLE_SEARCH_DAILY_QUOTA", "10000")),
+    on_retry=partial(record, retries=1),
+)
+
+# result pages read per query by `read_top_results`
+PAGES_PER_QUERY = int(os.getenv("ICP_PAGES_PER_QUERY", "3"))
+
 
+@traced("tool")
+@cached_search(namespace="google_search.run", on_hit=partial(record, cache_hits=1))
+@coalesced(on_shared=partial(record, coalesced=1))
 def run_google_search(query: str) -> str:
     """Search Google for recent results."""
-    return google_search.run(query=query)
+    result = search_rate_limiter.call(google_search.run, query=query)
+    knowledge_base.add_snippet(query, result)
+    return result
+
+
+@traced("tool")
+def lookup_knowledge_base(query: str) -> str:
+    """
+    Look up past research on this and related companies (subsidiaries, peers).
+    Check this before searching the web; results show when they were researched.
+    """
+    return format_hits(knowledge_base.search(query))
+
+
+@cached_search(namespace="google_search.results", on_hit=partial(record, cache_hits=1))
+@coalesced(on_shared=partial(record, coalesced=1))
+def search_results(query: str) -> List[dict]:
+    return search_rate_limiter.call(
+        google_search.results, query, num_results=PAGES_PER_QUERY
+    )
+
+
+@traced("tool")
+def read_top_results(query: str) -> str:
+    """
+    Search Google and read the full text of the top result pages. Use it when
+    snippets aren't enough, e.g. for careers pages and job postings.
+    """
+    # one entry per page, in rank order
+    results = {r["link"]: r for r in search_results(query) if r.get("link")}
+    results = list(results.values())
+    pages = page_fetcher.fetch(r["link"] for r in results)
+    evidence, snippets = [], []
+    for result, page in zip(results, pages):
+        chunks = relevant_chunks(page.text, query) or [result.get("snippet", "")]
+        snippets.extend((result["link"], chunk) for chunk in chunks)
+        evidence.append(
+            f"{result.get('title', '')} ({result['link']})\n" + "\n...\n".join(chunks)
+        )
+    knowledge_base.add_snippets(snippets)
+    return "\n\n".join(evidence) or "No results found."
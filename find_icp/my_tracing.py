@@ -0,0 +1,221 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_TRACE_PATH = Path(__file__).resolve().parent / "traces" / "icp_trace.jsonl"
+TRACE_PATH = Path(os.getenv("ICP_TRACE_PATH", DEFAULT_TRACE_PATH))
+
+COUNTERS = (
+    "prompt_tokens",
+    "completion_tokens",
+    "llm_calls",
+    "tool_calls",
+    "retries",
+    "cache_hits",
+    "coalesced",
+)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_lock = threading.Lock()
+
+
+class Span:
+    """
+    One timed unit of work: a flow, task, tool call or LLM call.
+
+    Counters recorded on a span are added to its parents when it finishes, so
+    the root span of a flow run holds the totals for the whole run.
+    """
+
+    def __init__(self, kind: str, name: str, parent: Optional["Span"] = None):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.root = parent.root if parent else self
+        self.span_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.wall_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self.counts: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.rows: List[dict] = []  # only filled on the root span
+
+    def add(self, **counts: int) -> None:
+        with _lock:
+            for name, value in counts.items():
+                self.counts[name] += value
+
+    def finish(self) -> dict:
+        self.wall_time = time.time() - self.started_at
+        row = dict(
+            run_id=self.root.span_id,
+            span_id=self.span_id,
+            parent_id=self.parent.span_id if self.parent else None,
+            kind=self.kind,
+            name=self.name,
+            started_at=self.started_at,
+            wall_time=self.wall_time,
+            error=self.error,
+            **self.counts,
+        )
+        if self.parent:
+            self.parent.add(**self.counts)
+        with _lock:
+            self.root.rows.append(row)
+        _write(row)
+        return row
+
+
+def _write(row: dict) -> None:
+    with _lock:
+        TRACE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with TRACE_PATH.open("a") as f:
+            f.write(json.dumps(row) + "\n")
+
+
+@contextmanager
+def span(kind: str, name: str) -> Iterator[Span]:
+    """Time the enclosed block as a child of the current span."""
+    current = Span(kind, name, parent=_current_span.get())
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = repr(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+        if current.parent is None:
+            summary = summarize(current)
+            _write(summary)
+            print(format_summary(summary))
+
+
+def traced(kind: str, name: Optional[str] = None) -> Callable:
+    """Decorate a function so every call is recorded as a span."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            with span(kind, name or func.__name__) as s:
+                if kind == "tool":
+                    s.add(tool_calls=1)
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record(**counts: int) -> None:
+    """Add to the counters of the current span, if there is one."""
+    current = _current_span.get()
+    if current is not None:
+        current.add(**counts)
+
+
+def summarize(root: Span) -> dict:
+    by_name = defaultdict(lambda: dict(calls=0, wall_time=0.0, errors=0))
+    for row in root.rows:
+        if row["span_id"] == root.span_id:
+            continue
+        entry = by_name[f"{row['kind']}:{row['name']}"]
+        entry["calls"] += 1
+        entry["wall_time"] += row["wall_time"]
+        entry["errors"] += row["error"] is not None
+    return dict(
+        run_id=root.span_id,
+        kind="summary",
+        name=root.name,
+        wall_time=root.wall_time,
+        error=root.error,
+        **root.counts,
+        by_name=dict(by_name),
+    )
+
+
+def format_summary(summary: dict) -> str:
+    lines = [
+        f"\n=== Trace summary: {summary['name']} ({summary['run_id']}) ===",
+        f"Wall time: {summary['wall_time']:.1f}s",
+        f"Tokens: {summary['prompt_tokens']} prompt / "
+        f"{summary['completion_tokens']} completion "
+        f"over {summary['llm_calls']} LLM calls",
+        f"Tool calls: {summary['tool_calls']} "
+        f"(cache hits: {summary['cache_hits']}, coalesced: {summary['coalesced']}, "
+        f"retries: {summary['retries']})",
+        "",
+    ]
+    for name, entry in sorted(
+        summary["by_name"].items(), key=lambda item: -item[1]["wall_time"]
+    ):
+        lines.append(
+            f"{name:<45} {entry['calls']:>5} calls {entry['wall_time']:>8.1f}s"
+            + (f"  {entry['errors']} errors" if entry["errors"] else "")
+        )
+    return "\n".join(lines)
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Record each chat model call (one agent turn) as an `llm` span with tokens."""
+
+    def __init__(self):
+        self._spans: Dict[uuid.UUID, Span] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        name = kwargs.get("name") or "chat_model"
+        self._spans[run_id] = Span("llm", name, parent=_current_span.get())
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        if not usage:
+            # streamed responses carry usage on the message instead
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    metadata = getattr(message, "usage_metadata", None) or {}
+                    prompt_tokens += metadata.get("input_tokens", 0)
+                    completion_tokens += metadata.get("output_tokens", 0)
+        llm_span.add(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            llm_calls=1,
+        )
+        llm_span.finish()
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.error = repr(error)
+            llm_span.add(llm_calls=1)
+            llm_span.finish()
+
+
+token_usage_handler = TokenUsageHandler()
+
+
+def install_token_tracing() -> None:
+    """Attach the token usage handler to ControlFlow's default model."""
+    import controlflow as cf
+
+    model = cf.defaults.model
+    callbacks = list(model.callbacks or [])
+    if token_usage_handler not in callbacks:
+        model.callbacks = [*callbacks, token_usage_handler]
@@ -84,3 +84,12 @@ class ICPScore(BaseModel):
     explanation: Optional[str] = Field(
         default=None, description="Detailed explanation of the score calculation"
     )
+
+
+# result name -> type of everything research_flow returns for a company
+RESEARCH_RESULT_TYPES = dict(
+    employee_count=TotalEmployeeCount,
+    data_professional_count=DataProfessionalCount,
+    data_stack=DataStack,
+    icp_score=ICPScore,
+)
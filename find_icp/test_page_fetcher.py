@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from my_page_fetcher import PageCache, PageFetcher
+
+
+class StubPageHandler(BaseHTTPRequestHandler):
+    """Serves a small HTML page with an ETag for every path."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # client (host, port) of every request, to tell reused connections apart
+    peers = []
+
+    def do_GET(self):
+        self.peers.append(self.client_address)
+        etag = f'"{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = (
+            f"<html><head><title>x</title></head><body><p>Page {self.path}</p>"
+            "<script>ignored()</script></body></html>"
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubPageHandler.peers = []
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def test_fetch_reuses_connections_across_calls(tmp_path):
+    server, base = serve()
+    fetcher = PageFetcher(cache=PageCache(tmp_path / "pages.sqlite3"))
+    try:
+        first = fetcher.fetch([f"{base}/a"])
+        second = fetcher.fetch([f"{base}/b"])
+    finally:
+        fetcher.close()
+        server.shutdown()
+
+    assert first[0].text == "Page /a"
+    assert second[0].text == "Page /b"
+    assert len(StubPageHandler.peers) == 2
+    assert len(set(StubPageHandler.peers)) == 1
+
+
+def test_fetch_many_revalidates_cached_pages(tmp_path):
+    server, base = serve()
+    fetcher = PageFetcher(cache=PageCache(tmp_path / "pages.sqlite3"))
+    urls = [f"{base}/a", f"{base}/b", f"{base}/a"]
+    try:
+        fetched = asyncio.run(fetcher.fetch_many(urls))
+        # a second caller on a different event loop shares the same client
+        revalidated = asyncio.run(fetcher.fetch_many(urls))
+    finally:
+        fetcher.close()
+        server.shutdown()
+
+    assert [p.status for p in fetched] == [200, 200]
+    assert [p.status for p in revalidated] == [304, 304]
+    assert [p.text for p in revalidated] == ["Page /a", "Page /b"]
+    assert all(p.from_cache for p in revalidated)
@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import my_rate_limit
+from my_rate_limit import QuotaExceeded, RateLimiter
+
+
+class FakeTime:
+    """Stands in for the time module: sleeping just moves the clock."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(my_rate_limit, "time", clock)
+    return clock
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        self.resp = SimpleNamespace(status=status)
+
+
+def test_bucket_refills_at_rate(tmp_path, clock):
+    limiter = RateLimiter("search", rate=4, burst=2, path=tmp_path / "rl.sqlite3")
+    assert limiter._try_acquire() == 0
+    assert limiter._try_acquire() == 0
+    assert limiter._try_acquire() == 0.25
+
+    clock.now += 0.25
+    assert limiter._try_acquire() == 0
+    # acquire() waits out the refill instead of returning early
+    limiter.acquire()
+    assert clock.slept == [0.25]
+
+
+def test_daily_quota_is_exhausted(tmp_path, clock):
+    limiter = RateLimiter(
+        "search", rate=100, daily_quota=3, path=tmp_path / "rl.sqlite3"
+    )
+    for _ in range(3):
+        limiter.acquire()
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire()
+    assert limiter.metrics()["remaining_quota"] == 0
+    assert limiter.metrics()["used_today"] == 3
+
+
+def test_call_retries_throttled_and_server_errors(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(my_rate_limit.random, "uniform", lambda low, high: high)
+    retried = []
+    limiter = RateLimiter(
+        "search",
+        rate=100,
+        path=tmp_path / "rl.sqlite3",
+        backoff_base=1,
+        on_retry=lambda: retried.append(1),
+    )
+    outcomes = [HttpError(429), HttpError(503), "results"]
+
+    def search():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert limiter.call(search) == "results"
+    assert limiter.retries == 2 and len(retried) == 2
+    # exponential backoff: 1 s, then 2 s
+    assert clock.slept == [1, 2]
+
+
+def test_call_gives_up(tmp_path, clock):
+    limiter = RateLimiter(
+        "search", rate=100, max_retries=2, path=tmp_path / "rl.sqlite3"
+    )
+    calls = []
+
+    def failing(status):
+        calls.append(status)
+        raise HttpError(status)
+
+    with pytest.raises(HttpError):
+        limiter.call(failing, 400)
+    assert calls == [400]
+
+    with pytest.raises(HttpError):
+        limiter.call(failing, 500)
+    assert calls == [400, 500, 500, 500]
+
+
+def test_workers_share_one_quota(tmp_path):
+    path = tmp_path / "rl.sqlite3"
+
+    def worker(_):
+        # a limiter (and SQLite connection) per worker, as in separate processes
+        limiter = RateLimiter("search", rate=1e6, daily_quota=50, path=path)
+        acquired = 0
+        for _ in range(20):
+            try:
+                limiter.acquire()
+            except QuotaExceeded:
+                break
+            acquired += 1
+        return acquired
+
+    with ThreadPoolExecutor(8) as pool:
+        assert sum(pool.map(worker, range(8))) == 50
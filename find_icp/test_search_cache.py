@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import my_search_cache
+from my_search_cache import SearchCache, cached_search
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **options):
+    clock = Clock()
+    monkeypatch.setattr(my_search_cache, "time", SimpleNamespace(time=clock))
+    return SearchCache(tmp_path / "search.sqlite3", **options), clock
+
+
+def test_cache_opens_lazily(tmp_path):
+    cache = SearchCache(tmp_path / "search.sqlite3")
+    assert not cache.path.exists()
+    cache.get("ns", "query")
+    assert cache.path.exists()
+
+
+def test_hit_and_miss_with_normalized_queries(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    assert cache.get("ns", "Snowflake  employees") is None
+    cache.set("ns", "Snowflake  employees", {"items": [1]})
+
+    assert cache.get("ns", "  snowflake employees ") == {"items": [1]}
+    assert cache.stats() == dict(hits=1, misses=1, hit_rate=0.5)
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl_seconds=60)
+    cache.set("ns", "q", "result")
+    clock.now += 59
+    assert cache.get("ns", "q") == "result"
+    clock.now += 2
+    assert cache.get("ns", "q") is None
+
+
+def test_namespaces_are_separate(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.set("customsearch.v1", "q", "raw")
+    cache.set("langchain", "q", "wrapped")
+    assert cache.get("customsearch.v1", "q") == "raw"
+    assert cache.get("langchain", "q") == "wrapped"
+    assert cache.get("other", "q") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, max_entries=2)
+    cache.set("ns", "a", 1)
+    clock.now += 1
+    cache.set("ns", "b", 2)
+    clock.now += 1
+    cache.get("ns", "a")
+    clock.now += 1
+    cache.set("ns", "c", 3)
+
+    assert cache.get("ns", "a") == 1
+    assert cache.get("ns", "b") is None
+    assert cache.get("ns", "c") == 3
+
+
+def test_cached_search_bypass_and_failures(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    calls = []
+    hits = []
+
+    @cached_search(cache=cache, namespace="test", on_hit=lambda: hits.append(1))
+    def search(query):
+        calls.append(query)
+        return None if query == "fails" else f"results for {query}"
+
+    assert search("dbt") == "results for dbt"
+    assert search("DBT") == "results for dbt"
+    assert search("dbt", bypass=True) == "results for dbt"
+    # None is not cached, so the failed lookup is retried
+    search("fails")
+    search("fails")
+
+    assert calls == ["dbt", "dbt", "fails", "fails"]
+    assert len(hits) == 1
@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from my_singleflight import SingleFlight, coalesced
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(group, func, callers):
+    """Call `func` for one key from `callers` threads that all overlap."""
+    release = threading.Event()
+
+    def blocked():
+        # hold the leader until every other caller is waiting on it
+        release.wait()
+        return func()
+
+    def call():
+        try:
+            return group.do("key", blocked)
+        except Exception as exc:
+            return exc
+
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(call) for _ in range(callers)]
+        wait_for(lambda: group.shared == callers - 1)
+        release.set()
+        return [f.result() for f in futures]
+
+
+def test_concurrent_calls_run_once():
+    group = SingleFlight()
+    runs = []
+
+    results = run_concurrently(group, lambda: runs.append(1) or "result", callers=8)
+
+    assert len(runs) == 1
+    assert sorted(results) == [("result", False)] + [("result", True)] * 7
+    assert group.stats() == dict(calls=1, shared=7, shared_rate=7 / 8)
+
+
+def test_exception_reaches_every_waiter():
+    group = SingleFlight()
+    error = RuntimeError("quota exceeded")
+
+    def fail():
+        raise error
+
+    results = run_concurrently(group, fail, callers=5)
+
+    assert results == [error] * 5
+    assert group.calls == 1
+
+
+def test_key_is_forgotten_once_done():
+    group = SingleFlight()
+    assert group.do("key", lambda: 1) == (1, False)
+    assert group.do("key", lambda: 2) == (2, False)
+    with pytest.raises(ValueError):
+        group.do("key", int, "not a number")
+    assert group.do("key", lambda: 3) == (3, False)
+
+
+def test_coalesced_shares_equivalent_queries():
+    group = SingleFlight()
+    release = threading.Event()
+    shared = []
+    queries = []
+
+    @coalesced(group=group, on_shared=lambda: shared.append(1))
+    def search(query):
+        queries.append(query)
+        release.wait()
+        return f"results for {query}"
+
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(search, "Snowflake adoption  banks")
+        wait_for(lambda: queries)
+        second = pool.submit(search, "snowflake adoption banks")
+        wait_for(lambda: group.shared == 1)
+        release.set()
+        assert first.result() == second.result()
+
+    assert queries == ["Snowflake adoption  banks"]
+    assert len(shared) == 1
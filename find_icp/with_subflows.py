@@ -1,17 +1,29 @@
 import controlflow as cf
-from my_tools import run_google_search
+from functools import partial
+from my_knowledge_base import indexed
+from my_tools import lookup_knowledge_base, read_top_results, run_google_search
 from my_types import TotalEmployeeCount, DataStack, ICPScore, DataProfessionalCount
 from my_prettify import prettify
+from my_concurrency import run_concurrently
+from my_result_store import memoized_result
+from my_scoring import score_company
+from my_tracing import install_token_tracing, record, traced
 
 researcher = cf.Agent(
     "Researcher",
     instructions="""
     You are a company research agent: cross-reference findings, prioritize recent data, cite sources, rate confidence levels, and differentiate between facts and guesses. Adapt your approach based on company specifics and note any biases or limitations in data sources.
+    Check past research with lookup_knowledge_base first and only search the web when it has nothing relevant and recent.
     """,
-    tools=[run_google_search],
+    tools=[lookup_knowledge_base, run_google_search, read_top_results],
 )
 
+install_token_tracing()
 
+
+@traced("flow")
+@memoized_result(TotalEmployeeCount, on_hit=partial(record, cache_hits=1))
+@indexed("employee_count")
 @cf.flow()
 def get_total_employee_count(company_name: str) -> TotalEmployeeCount:
     return cf.Task(
@@ -21,6 +33,9 @@ def get_total_employee_count(company_name: str) -> TotalEmployeeCount:
     )
 
 
+@traced("flow")
+@memoized_result(DataProfessionalCount, on_hit=partial(record, cache_hits=1))
+@indexed("data_professional_count")
 @cf.flow()
 def get_data_professional_count(company_name: str) -> DataProfessionalCount:
     return cf.Task(
@@ -30,6 +45,9 @@ def get_data_professional_count(company_name: str) -> DataProfessionalCount:
     )
 
 
+@traced("flow")
+@memoized_result(DataStack, on_hit=partial(record, cache_hits=1))
+@indexed("data_stack")
 @cf.flow()
 def get_data_stack(company_name: str) -> DataStack:
     return cf.Task(
@@ -44,39 +62,62 @@ def get_data_stack(company_name: str) -> DataStack:
     )
 
 
+@traced("flow")
 @cf.flow()
 def calculate_icp_score(
     company_name: str,
     employee_count: TotalEmployeeCount,
     data_professional_count: DataProfessionalCount,
     data_stack: DataStack,
+    explain: bool = False,
 ) -> ICPScore:
-    return cf.Task(
-        objective=f"""Determine the Ideal Customer Profile (ICP) score for {company_name} on a scale of 0-100:
-        - Consider the total number of employees, size of the data team, and the company's tech stack.
-        - Higher scores should be given for larger employee counts and data teams.
-        - The tech stack should be evaluated based on the presence of these tools (in order of importance):
-        python, databricks, dbt, snowflake, kubernetes, kafka, openai, aws, gcp, azure, docker.
-        - Combinations of these tools should result in even higher scores.
-        - Provide a final ICP score (0-100) with a breakdown of contributing factors and a brief explanation of the scoring.
+    # the score itself is deterministic; the LLM only explains it, if asked to
+    icp_score = score_company(employee_count, data_professional_count, data_stack)
+    if explain:
+        explanation_task = cf.Task(
+            objective=f"""Explain the Ideal Customer Profile (ICP) score of {company_name}:
+        - The 0-100 score and its factors are already computed; do not recompute them.
+        - Briefly explain which of the employee count, data team size and tech stack
+        raised or lowered the score, referring to the key tools found.
         """,
-        context=dict(
-            employee_count=employee_count,
-            data_professional_count=data_professional_count,
-            data_stack=data_stack,
-        ),
-        agents=[researcher],
-        result_type=ICPScore,
-    )
+            context=dict(
+                employee_count=employee_count,
+                data_professional_count=data_professional_count,
+                data_stack=data_stack,
+                icp_score=icp_score,
+            ),
+            agents=[researcher],
+            result_type=str,
+        )
+        icp_score.explanation = traced("task", "explanation")(explanation_task.run)()
+    return icp_score
 
 
+@traced("flow")
 @cf.flow()
-def research_flow_parent(company_name: str):
-    total_employee_count = get_total_employee_count(company_name)
-    data_professional_count = get_data_professional_count(company_name)
-    data_stack = get_data_stack(company_name)
+def research_flow_parent(
+    company_name: str, concurrent: bool = False, explain: bool = False
+):
+    if concurrent:
+        results = run_concurrently(
+            total_employee_count=lambda: get_total_employee_count(company_name),
+            data_professional_count=lambda: get_data_professional_count(company_name),
+            data_stack=lambda: get_data_stack(company_name),
+        )
+        total_employee_count = results["total_employee_count"]
+        data_professional_count = results["data_professional_count"]
+        data_stack = results["data_stack"]
+    else:
+        total_employee_count = get_total_employee_count(company_name)
+        data_professional_count = get_data_professional_count(company_name)
+        data_stack = get_data_stack(company_name)
+
     icp_score = calculate_icp_score(
-        company_name, total_employee_count, data_professional_count, data_stack
+        company_name,
+        total_employee_count,
+        data_professional_count,
+        data_stack,
+        explain=explain,
     )
     return icp_score
 
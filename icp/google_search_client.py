@@ -0,0 +1,148 @@
+import asyncio
+import threading
+from typing import Iterable, List, Optional
+
+import httpx
+
+CUSTOM_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+# the Custom Search API returns at most 10 results per page and 100 per query
+PAGE_SIZE = 10
+MAX_RESULTS = 100
+
+
+class GoogleSearchClient:
+    """
+    Async client for the Google Custom Search JSON API.
+
+    All requests go through one pooled `httpx.AsyncClient`, so connections are
+    kept alive between calls, and at most `max_in_flight` requests run at once.
+
+    Example:
+        ```python
+        async with GoogleSearchClient(api_key, cse_id) as client:
+            results = await client.search_many(["Blackstone employee count"])
+        ```
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        cse_id: str,
+        base_url: str = CUSTOM_SEARCH_URL,
+        max_in_flight: int = 10,
+        timeout: float = 10.0,
+    ):
+        self.api_key = api_key
+        self.cse_id = cse_id
+        self.base_url = base_url
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=max_in_flight,
+            ),
+        )
+
+    async def __aenter__(self) -> "GoogleSearchClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _get_page(self, query: str, start: int, num: int) -> Optional[dict]:
+        params = dict(key=self.api_key, cx=self.cse_id, q=query, start=start, num=num)
+        async with self._semaphore:
+            response = await self._client.get(self.base_url, params=params)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
+
+    async def search(self, query: str, num_results: int = PAGE_SIZE) -> Optional[dict]:
+        """
+        Search for a query, following `start=` pagination up to `num_results`.
+
+        Returns:
+            Optional[dict]: The first page's response with the `items` of all
+            fetched pages, or None if the first page failed.
+        """
+        num_results = min(num_results, MAX_RESULTS)
+        result = None
+        items = []
+        for start in range(1, num_results + 1, PAGE_SIZE):
+            num = min(PAGE_SIZE, num_results - start + 1)
+            page = await self._get_page(query, start, num)
+            if page is None:
+                break
+            if result is None:
+                result = page
+            items.extend(page.get("items", []))
+            if "nextPage" not in page.get("queries", {}):
+                break
+
+        if result is not None:
+            result["items"] = items
+        return result
+
+    async def search_many(
+        self, queries: Iterable[str], num_results: int = PAGE_SIZE
+    ) -> List[Optional[dict]]:
+        """Run several searches concurrently, returning results in query order."""
+        return await asyncio.gather(
+            *(self.search(query, num_results) for query in queries)
+        )
+
+
+class SyncGoogleSearchClient:
+    """
+    Blocking wrapper around one long-lived `GoogleSearchClient`.
+
+    The async client lives on a private event loop in a daemon thread, so
+    every call from synchronous code reuses the same pooled keep-alive
+    connections instead of opening a new client per query.
+
+    Example:
+        ```python
+        with SyncGoogleSearchClient(api_key, cse_id) as client:
+            result = client.search("Blackstone employee count")
+        ```
+    """
+
+    def __init__(self, api_key: str, cse_id: str, **options):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        # created on its loop, which its connections and semaphore belong to
+        self._client = self._run(self._create(api_key, cse_id, options))
+
+    @staticmethod
+    async def _create(api_key: str, cse_id: str, options: dict) -> GoogleSearchClient:
+        return GoogleSearchClient(api_key, cse_id, **options)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def search(self, query: str, num_results: int = PAGE_SIZE) -> Optional[dict]:
+        return self._run(self._client.search(query, num_results))
+
+    def search_many(
+        self, queries: Iterable[str], num_results: int = PAGE_SIZE
+    ) -> List[Optional[dict]]:
+        return self._run(self._client.search_many(queries, num_results))
+
+    def close(self) -> None:
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "SyncGoogleSearchClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,32 +1,12 @@
 import controlflow as cf
+from prompt_registry import prompts
 
 # ------------------------------------------------------------------------------
 
 # create an agent to be the researcher
 researcher = cf.Agent(
     "Researcher",
-    instructions=f"""
-    As a specialized company research agent, your responsibilities include:
-    1. Cross-reference all findings with 1-2 additional sources.
-    2. Make educated guesses when reliable sources are scarce, based on available info or company category.
-    3. Prioritize the most recent data in all analyses.
-    4. Cite sources and dates for all key findings, ensuring traceability.
-    5. Rate confidence on a 0-5 scale:
-       5: Multiple corroborating sources with near-identical information
-       4: Strong agreement among sources with minor variations
-       3: Moderate confidence, some conflicting information
-       2: Low confidence, significant data gaps or conflicts
-       1: Very low confidence, mostly educated guesses
-       0: Complete uncertainty, speculation based on tangential information
-    6. Balance brevity with essential details in responses.
-    7. Flag tasks as potentially incomplete if real-time research tools are unavailable.
-    8. Clearly differentiate between factual data and educated guesses.
-    9. Provide brief rationales for confidence ratings.
-    10. Highlight significant discrepancies between sources.
-    11. Adapt research approach based on company size, industry, and public/private status.
-    12. Consider recent news, market trends, and industry benchmarks in your analysis.
-    13. Note any potential biases or limitations in the data sources used.
-    """,
+    instructions=prompts.render("researcher", version=1),
 )
 
 
@@ -0,0 +1,160 @@
+import functools
+import textwrap
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class Prompt(BaseModel):
+    name: str
+    version: int
+    full: str
+    compact: str
+
+
+class PromptRegistry:
+    """
+    Versioned agent instructions, defined once and shared by every flow.
+
+    Each version has a full form and a compact one with the same rules in
+    far fewer tokens; `render` returns the compact form by default, and
+    `report` compares the two. Prompts are rendered dedented and stripped,
+    so a version always renders to the same text and token count.
+
+    The compact prompts (under 200 tokens) are well below the 1024 tokens
+    OpenAI's automatic prefix caching needs, so they are not cached: the
+    saving is in the tokens that are no longer sent.
+    """
+
+    def __init__(self):
+        self._prompts: Dict[str, Dict[int, Prompt]] = {}
+
+    def register(self, name: str, version: int, full: str, compact: str) -> Prompt:
+        prompt = Prompt(
+            name=name,
+            version=version,
+            full=textwrap.dedent(full).strip(),
+            compact=textwrap.dedent(compact).strip(),
+        )
+        self._prompts.setdefault(name, {})[version] = prompt
+        return prompt
+
+    def get(self, name: str, version: Optional[int] = None) -> Prompt:
+        versions = self._prompts[name]
+        return versions[version if version is not None else max(versions)]
+
+    def render(
+        self, name: str, version: Optional[int] = None, compact: bool = True
+    ) -> str:
+        prompt = self.get(name, version)
+        return prompt.compact if compact else prompt.full
+
+    def report(self, model: str = "gpt-4o") -> List[dict]:
+        """Token counts of the full and compact form of every registered prompt."""
+        return [
+            dict(
+                name=prompt.name,
+                version=prompt.version,
+                full_tokens=count_tokens(prompt.full, model),
+                compact_tokens=count_tokens(prompt.compact, model),
+            )
+            for versions in self._prompts.values()
+            for prompt in versions.values()
+        ]
+
+
+@functools.lru_cache
+def _encoding(model: str):
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # tiktoken missing, unknown model or no network to fetch the encoding
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Count tokens with tiktoken, or estimate ~4 characters per token without it."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+prompts = PromptRegistry()
+
+prompts.register(
+    "researcher",
+    version=1,
+    full="""
+    As a specialized company research agent, your responsibilities include:
+    1. Cross-reference all findings with 1-2 additional sources.
+    2. Make educated guesses when reliable sources are scarce, based on available info or company category.
+    3. Prioritize the most recent data in all analyses.
+    4. Cite sources and dates for all key findings, ensuring traceability.
+    5. Rate confidence on a 0-5 scale:
+       5: Multiple corroborating sources with near-identical information
+       4: Strong agreement among sources with minor variations
+       3: Moderate confidence, some conflicting information
+       2: Low confidence, significant data gaps or conflicts
+       1: Very low confidence, mostly educated guesses
+       0: Complete uncertainty, speculation based on tangential information
+    6. Balance brevity with essential details in responses.
+    7. Flag tasks as potentially incomplete if real-time research tools are unavailable.
+    8. Clearly differentiate between factual data and educated guesses.
+    9. Provide brief rationales for confidence ratings.
+    10. Highlight significant discrepancies between sources.
+    11. Adapt research approach based on company size, industry, and public/private status.
+    12. Consider recent news, market trends, and industry benchmarks in your analysis.
+    13. Note any potential biases or limitations in the data sources used.
+    """,
+    compact="""
+    Company research agent. Cross-check findings with 1-2 more sources; prefer recent data; cite source and date for key facts; separate facts from educated guesses (guess from company category if sources are scarce); flag source discrepancies, biases and limits; adapt to size, industry, public/private; use recent news, trends, benchmarks; be brief but complete.
+    Confidence 0-5 with a short reason: 5 sources agree; 4 minor variation; 3 some conflict; 2 big gaps/conflicts; 1 mostly guesses; 0 speculation.
+    Flag the task as possibly incomplete without real-time research tools.
+    """,
+)
+
+prompts.register(
+    "researcher",
+    version=2,
+    full="""
+    As a specialized company research agent, your responsibilities include:
+    1. Cross-reference all findings with 1-2 additional sources.
+    2. Make educated guesses when reliable sources are scarce, based on available info or company category.
+    3. Prioritize the most recent data in all analyses.
+    4. Cite sources and dates for all key findings, ensuring traceability.
+    5. Rate confidence on a 0-5 scale for each key piece of information:
+       5: Multiple corroborating sources with near-identical information
+       4: Strong agreement among sources with minor variations
+       3: Moderate confidence, some conflicting information
+       2: Low confidence, significant data gaps or conflicts
+       1: Very low confidence, mostly educated guesses
+       0: Complete uncertainty, speculation based on tangential information
+    6. Provide brief explanations for each confidence rating.
+    7. Balance brevity with essential details in responses.
+    8. Clearly differentiate between factual data and educated guesses.
+    9. Highlight significant discrepancies between sources.
+    10. Adapt research approach based on company size, industry, and public/private status.
+    11. Consider recent news, market trends, and industry benchmarks in your analysis.
+    12. Note any potential biases or limitations in the data sources used.
+    13. Always check for the availability of real-time search tools before starting your research.
+    14. If real-time search tools are unavailable, clearly state this limitation and significantly lower your confidence ratings.
+    15. Remember that your training data has a cutoff date, and you should factor this into your confidence ratings when real-time data is unavailable.
+    16. In the absence of real-time data, clearly state that your information might be outdated and provide the approximate date of your most recent reliable data.
+    """,
+    compact="""
+    Company research agent. Cross-check findings with 1-2 more sources; prefer recent data; cite source and date for key facts; separate facts from educated guesses (guess from company category if sources are scarce); flag source discrepancies, biases and limits; adapt to size, industry, public/private; use recent news, trends, benchmarks; be brief but complete.
+    Confidence 0-5 per key fact with a short reason: 5 sources agree; 4 minor variation; 3 some conflict; 2 big gaps/conflicts; 1 mostly guesses; 0 speculation.
+    First check for real-time search tools. Without them: say so, lower confidence, account for your training cutoff and give the date of your newest reliable data.
+    """,
+)
+
+
+if __name__ == "__main__":
+    for row in prompts.report():
+        print(
+            f"{row['name']} v{row['version']}: {row['full_tokens']} tokens full, "
+            f"{row['compact_tokens']} compact"
+        )
@@ -1,7 +1,18 @@
-import requests
+import asyncio
 import json
+import sys
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
 from dotenv import load_dotenv
 import os
+from google_search_client import GoogleSearchClient, SyncGoogleSearchClient
+
+# the search cache is shared with find_icp, whose modules are top-level too
+sys.path.append(str(Path(__file__).resolve().parents[1] / "find_icp"))
+from my_search_cache import cached_search  # noqa: E402
 
 # Load environment variables from .env file
 load_dotenv()
@@ -9,13 +20,15 @@ google_api_key = os.getenv("GOOGLE_API_KEY")
 google_cse_id = os.getenv("GOOGLE_CSE_ID")
 
 
+@lru_cache(maxsize=None)
+def _search_client() -> SyncGoogleSearchClient:
+    # one client for the whole process, so queries share warm connections
+    return SyncGoogleSearchClient(google_api_key, google_cse_id)
+
+
+@cached_search(namespace="customsearch.v1")
 def google_search(query):
-    url = f"https://www.googleapis.com/customsearch/v1?key={google_api_key}&cx={google_cse_id}&q={query}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return None
+    return _search_client().search(query)
 
 
 # Test the Google Search function
@@ -27,5 +40,76 @@ def test_google_search():
         print("Error fetching data from Google Search API")
 
 
+class StubSearchHandler(BaseHTTPRequestHandler):
+    """Answers like the Custom Search API with 25 numbered results per query."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    total_results = 25
+    # client (host, port) of every request, to tell reused connections apart
+    peers = []
+
+    def do_GET(self):
+        self.peers.append(self.client_address)
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        start, num = int(params["start"]), int(params["num"])
+        end = min(start + num, self.total_results + 1)
+        body = {
+            "queries": {"request": [params]},
+            "items": [
+                {"title": f"{params['q']} #{i}", "link": f"https://example.com/{i}"}
+                for i in range(start, end)
+            ],
+        }
+        if end <= self.total_results:
+            body["queries"]["nextPage"] = [{"startIndex": end}]
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_search_many_against_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSearchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def search():
+        async with GoogleSearchClient(
+            "key", "cse", base_url=f"http://127.0.0.1:{server.server_port}/v1"
+        ) as client:
+            return await client.search_many(["snowflake", "dbt"], num_results=30)
+
+    try:
+        results = asyncio.run(search())
+    finally:
+        server.shutdown()
+
+    assert [len(r["items"]) for r in results] == [25, 25]
+    assert results[1]["items"][-1]["title"] == "dbt #25"
+
+
+def test_sync_client_reuses_connection():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSearchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubSearchHandler.peers = []
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    try:
+        with SyncGoogleSearchClient("key", "cse", base_url=base_url) as client:
+            first = client.search("snowflake")
+            second = client.search("dbt")
+    finally:
+        server.shutdown()
+
+    assert first["items"][0]["title"] == "snowflake #1"
+    assert second["items"][0]["title"] == "dbt #1"
+    assert len(StubSearchHandler.peers) == 2
+    assert len(set(StubSearchHandler.peers)) == 1
+
+
 if __name__ == "__main__":
     test_google_search()
@@ -0,0 +1,264 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Union
+
+import pandas as pd
+from prefect.exceptions import MissingContextError
+from prefect.logging import get_run_logger
+
+CACHE_DIR = Path(
+    os.getenv("PREF_DEMO_CACHE_DIR", Path(__file__).resolve().parent / ".cache")
+)
+DEFAULT_ARTIFACT_DIR = CACHE_DIR / "artifacts"
+
+_CHUNK = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+def _logger():
+    # the flow or task run's logger, so messages show up with the run
+    try:
+        return get_run_logger()
+    except MissingContextError:
+        return logger
+
+
+def digest_bytes(data: Union[str, bytes]) -> str:
+    """blake2b of a string or bytes, hashed a chunk at a time without copies."""
+    if isinstance(data, str):
+        data = data.encode()
+    h = hashlib.blake2b(digest_size=16)
+    view = memoryview(data)
+    for start in range(0, len(view), _CHUNK):
+        h.update(view[start : start + _CHUNK])
+    return h.hexdigest()
+
+
+def digest_frame(data: Union[pd.DataFrame, pd.Series]) -> str:
+    """
+    Content hash of a DataFrame or Series: its column names and values.
+
+    Values are hashed column-wise by pandas into one uint64 per row, which is
+    streamed into blake2b, so nothing is pickled or converted to Python objects.
+    Dtypes are left out on purpose: reading an artifact back from Parquet may
+    turn object columns into string columns, and the next stage must still see
+    the same input.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    frame = data.to_frame() if isinstance(data, pd.Series) else data
+    h.update(json.dumps([type(data).__name__, list(map(str, frame.columns))]).encode())
+    rows = pd.util.hash_pandas_object(frame, index=True).to_numpy()
+    view = memoryview(rows).cast("B")
+    for start in range(0, len(view), _CHUNK):
+        h.update(view[start : start + _CHUNK])
+    return h.hexdigest()
+
+
+def digest_value(value) -> str:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return digest_frame(value)
+    if isinstance(value, (str, bytes)):
+        return digest_bytes(value)
+    return digest_bytes(json.dumps(value, sort_keys=True, default=str))
+
+
+class ArtifactStore:
+    """
+    Pipeline DataFrames as Parquet files named by their content hash.
+
+    A stage's output is recorded under a key made of the stage name, its
+    version and the hashes of its inputs. Calling a stage again with the
+    same inputs returns the stored output without running it, so a re-run
+    after a downstream failure picks up where the last one stopped. Equal
+    outputs of different runs share one file.
+
+    Outputs not used for `max_age` seconds are dropped, and the least
+    recently used ones once the files outgrow `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_ARTIFACT_DIR,
+        max_bytes: int = int(os.getenv("PREF_DEMO_ARTIFACTS_MB", "2048")) << 20,
+        max_age: float = float(os.getenv("PREF_DEMO_ARTIFACTS_DAYS", "7")) * 86400,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _index(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.directory / "index.sqlite3", check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(stages)")
+            }
+            if columns and "used_at" not in columns:
+                # index written before eviction existed; it only holds cached results
+                self._conn.execute("DROP TABLE stages")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS stages (
+                    key TEXT PRIMARY KEY,
+                    stage TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.parquet"
+
+    def put(self, data: Union[pd.DataFrame, pd.Series]) -> str:
+        """Store a DataFrame or Series unless it is already there; its digest."""
+        digest = digest_frame(data)
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            frame = data.to_frame() if isinstance(data, pd.Series) else data
+            partial = path.with_suffix(f".{threading.get_ident()}.tmp")
+            frame.to_parquet(partial, compression="zstd")
+            os.replace(partial, path)
+        return digest
+
+    def get(self, digest: str, kind: str = "DataFrame"):
+        frame = pd.read_parquet(self._path(digest))
+        return frame.iloc[:, 0] if kind == "Series" else frame
+
+    def lookup(self, key: str) -> Optional[Union[pd.DataFrame, pd.Series]]:
+        with self._lock:
+            conn = self._index()
+            row = conn.execute(
+                "SELECT output, kind FROM stages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE stages SET used_at = ? WHERE key = ?", (time.time(), key)
+                )
+                conn.commit()
+        if row is None or not self._path(row[0]).exists():
+            return None
+        return self.get(*row)
+
+    def record(self, key: str, stage: str, output: Union[pd.DataFrame, pd.Series]):
+        digest = self.put(output)
+        now = time.time()
+        with self._lock:
+            conn = self._index()
+            conn.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    stage,
+                    digest,
+                    type(output).__name__,
+                    self._path(digest).stat().st_size,
+                    now,
+                    now,
+                ),
+            )
+            conn.commit()
+        self._evict()
+
+    def _evict(self) -> None:
+        # a file may back several stages; it lives as long as its newest use
+        with self._lock:
+            rows = self._index().execute(
+                """
+                SELECT output, MAX(bytes), MAX(used_at) AS last_used FROM stages
+                GROUP BY output ORDER BY last_used DESC
+                """
+            ).fetchall()
+        cutoff = time.time() - self.max_age
+        total, evicted = 0, []
+        for output, size, used_at in rows:
+            total += size
+            if total > self.max_bytes or used_at < cutoff:
+                evicted.append(output)
+        self._drop(evicted)
+
+    def _drop(self, outputs: Iterable[str]) -> None:
+        outputs = list(outputs)
+        if not outputs:
+            return
+        with self._lock:
+            conn = self._index()
+            conn.executemany(
+                "DELETE FROM stages WHERE output = ?", [(o,) for o in outputs]
+            )
+            conn.commit()
+        for output in outputs:
+            self._path(output).unlink(missing_ok=True)
+
+    def stage(self, name: str, version: Union[str, Callable[[], str]] = "1"):
+        """
+        Skip the decorated function when it already ran on the same inputs.
+
+        Arguments are hashed by content (DataFrames with `digest_frame`,
+        strings and bytes with `digest_bytes`). Bump `version`, or pass a
+        callable returning one, when the stage's logic or configuration
+        changes. Only DataFrame and Series results are stored.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                current = version() if callable(version) else version
+                try:
+                    inputs = [digest_value(a) for a in args] + [
+                        f"{k}={digest_value(v)}" for k, v in sorted(kwargs.items())
+                    ]
+                except TypeError:
+                    # e.g. unhashable cell values: just run the stage
+                    return func(*args, **kwargs)
+                key = digest_bytes(json.dumps([name, current, inputs]))
+                stored = self.lookup(key)
+                if stored is not None:
+                    self.hits += 1
+                    _logger().info(f"{name}: inputs unchanged, reusing stored result")
+                    return stored
+                self.misses += 1
+                result = func(*args, **kwargs)
+                if isinstance(result, (pd.DataFrame, pd.Series)):
+                    try:
+                        self.record(key, name, result)
+                    except Exception as exc:
+                        warnings.warn(f"could not store {name} result: {exc!r}")
+                return result
+
+            return wrapper
+
+        return decorator
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / total if total else 0.0,
+        )
+
+
+artifact_store = ArtifactStore()
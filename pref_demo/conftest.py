@@ -0,0 +1,16 @@
+import pytest
+
+import snowflake_blocks
+from query_cache import QueryCache
+from snowflake_blocks import SnowflakeConnection
+
+
+@pytest.fixture
+def sqlite_conn(tmp_path, monkeypatch):
+    """A local SQLite database standing in for the warehouse."""
+    monkeypatch.setattr(
+        snowflake_blocks, "query_cache", QueryCache(tmp_path / "queries")
+    )
+    return SnowflakeConnection(
+        connection_url=f"sqlite:///{tmp_path / 'warehouse.db'}", cache_ttl=0
+    )
@@ -0,0 +1,262 @@
+import hashlib
+import re
+import warnings
+from pathlib import Path
+from typing import Annotated, Dict, List, Literal, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import yaml
+from pydantic import BaseModel, Field
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent / "enrichment_rules.yaml"
+
+
+class BandRule(BaseModel):
+    """Bucket a numeric column into labelled bands, like pd.cut."""
+
+    kind: Literal["band"]
+    output: str
+    column: str
+    bins: List[float]
+    labels: List[str]
+    # bands are (low, high]; set False for [low, high)
+    right: bool = True
+    default: Optional[str] = None
+
+    def apply(self, df: pd.DataFrame) -> pd.Series:
+        values = pd.to_numeric(df[self.column], errors="coerce")
+        bands = pd.cut(values, bins=self.bins, labels=self.labels, right=self.right)
+        return _with_default(bands.astype(object), self.default)
+
+
+class MapRule(BaseModel):
+    """Look values up in a mapping, ignoring case and surrounding whitespace."""
+
+    kind: Literal["map"]
+    output: str
+    column: str
+    mapping: Dict[str, str]
+    default: Optional[str] = None
+
+    def apply(self, df: pd.DataFrame) -> pd.Series:
+        mapping = {_normalize(k): v for k, v in self.mapping.items()}
+        codes, uniques = pd.factorize(df[self.column])
+        keys = pd.Series(uniques, dtype="string").str.strip().str.lower()
+        labels = keys.map(mapping).to_numpy(object)
+        return _per_unique(labels, codes, df.index, self.default)
+
+
+class KeywordRule(BaseModel):
+    """The label of the first group with a keyword found in a text column."""
+
+    kind: Literal["keywords"]
+    output: str
+    column: str
+    # label -> keywords, checked in order
+    keywords: Dict[str, List[str]]
+    default: Optional[str] = None
+
+    def apply(self, df: pd.DataFrame) -> pd.Series:
+        codes, uniques = pd.factorize(df[self.column])
+        text = pd.Series(uniques, dtype="string").fillna("")
+        conditions = [
+            text.str.contains(
+                r"\b(?:" + "|".join(map(re.escape, words)) + r")\b",
+                case=False,
+                regex=True,
+            ).to_numpy(dtype=bool)
+            for words in self.keywords.values()
+        ]
+        labels = np.select(conditions, list(self.keywords), default=None)
+        return _per_unique(labels.astype(object), codes, df.index, self.default)
+
+
+class ExpressionRule(BaseModel):
+    """A column computed with DataFrame.eval, e.g. `revenue / employees`."""
+
+    kind: Literal["expression"]
+    output: str
+    expression: str
+
+    def apply(self, df: pd.DataFrame) -> pd.Series:
+        return df.eval(self.expression)
+
+
+class JoinRule(BaseModel):
+    """
+    Join columns from a CSV or Parquet file (or Parquet directory) by key.
+
+    Keys are compared ignoring case and surrounding whitespace. When
+    `latest_by` is set, only the newest row per key is used. A missing file
+    leaves the output columns empty.
+    """
+
+    kind: Literal["join"]
+    path: str
+    # lead column matched against the source's `key` column
+    column: str
+    key: str
+    # source column -> output column
+    columns: Dict[str, str]
+    latest_by: Optional[str] = None
+    where: Optional[str] = None
+
+    def load(self, base: Path) -> Optional[pd.DataFrame]:
+        path = base / self.path
+        if not path.exists():
+            warnings.warn(f"join source {path} not found; leaving columns empty")
+            return None
+        if path.suffix == ".csv":
+            source = pd.read_csv(path)
+        else:
+            source = self._read_parquet(path)
+        if self.key not in source.columns:
+            warnings.warn(f"join source {path} has no {self.key!r} column")
+            return None
+        for column in set(self.columns) - set(source.columns):
+            # e.g. only error rows written so far
+            warnings.warn(f"join source {path} has no {column!r}; leaving it empty")
+            source[column] = np.nan
+        if self.where:
+            source = source.query(self.where)
+        if self.latest_by in source.columns:
+            source = source.sort_values(self.latest_by)
+        keys = source[self.key].astype("string").str.strip().str.lower()
+        source = source.assign(_key=keys).drop_duplicates("_key", keep="last")
+        return source.set_index("_key")[list(self.columns)].rename(columns=self.columns)
+
+    def _read_parquet(self, path: Path) -> pd.DataFrame:
+        """
+        The columns the rule uses, from a Parquet file or partitioned directory.
+
+        Parts may have different columns, so they are read with the union of
+        their schemas instead of the first part's; a column missing from a
+        part comes back as nulls.
+        """
+        dataset = ds.dataset(path, format="parquet", partitioning="hive")
+        schema = pa.unify_schemas(
+            [dataset.schema] + [pq.read_schema(f) for f in dataset.files],
+            promote_options="permissive",
+        )
+        wanted = [self.key, self.latest_by, *self.columns]
+        # columns the `where` expression may refer to
+        wanted += [name for name in schema.names if self.where and name in self.where]
+        columns = [name for name in dict.fromkeys(wanted) if name in schema.names]
+        dataset = ds.dataset(path, schema=schema, format="parquet", partitioning="hive")
+        return dataset.to_table(columns=columns).to_pandas()
+
+    def apply(self, df: pd.DataFrame, source: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if source is None:
+            return pd.DataFrame(
+                {column: np.nan for column in self.columns.values()}, index=df.index
+            )
+        keys = df[self.column].astype("string").str.strip().str.lower()
+        return source.reindex(keys.to_numpy()).set_axis(df.index)
+
+
+Rule = Annotated[
+    Union[BandRule, MapRule, KeywordRule, ExpressionRule, JoinRule],
+    Field(discriminator="kind"),
+]
+
+
+class EnrichmentSpec(BaseModel):
+    rules: List[Rule]
+
+
+class EnrichmentEngine:
+    """
+    Derived lead columns from a declarative rule spec, computed column-wise.
+
+    Every rule is a vectorized pandas/NumPy operation over the whole frame,
+    so adding a column costs about the same for ten rows or ten million.
+    Rules run in order and may use columns added by earlier rules. Join
+    sources are loaded once per engine, not once per chunk, and loaded again
+    when their files change.
+
+    Example:
+        ```python
+        engine = EnrichmentEngine.from_yaml()
+        enriched_df = engine.apply(df)
+        ```
+    """
+
+    def __init__(self, spec: EnrichmentSpec, base: Path = DEFAULT_RULES_PATH.parent):
+        self.spec = spec
+        self.base = base
+        self._sources: Dict[int, Optional[pd.DataFrame]] = {}
+        self._sources_fingerprint: Optional[str] = None
+
+    @classmethod
+    def from_yaml(cls, path: Path = DEFAULT_RULES_PATH) -> "EnrichmentEngine":
+        path = Path(path)
+        spec = EnrichmentSpec.model_validate(yaml.safe_load(path.read_text()))
+        # join paths are relative to the spec file
+        return cls(spec, base=path.parent)
+
+    @property
+    def outputs(self) -> List[str]:
+        names = []
+        for rule in self.spec.rules:
+            if isinstance(rule, JoinRule):
+                names.extend(rule.columns.values())
+            else:
+                names.append(rule.output)
+        return names
+
+    def fingerprint(self) -> str:
+        """Changes whenever the rules or a join source file change."""
+        parts = [self.spec.model_dump_json()]
+        for rule in self.spec.rules:
+            if isinstance(rule, JoinRule):
+                path = self.base / rule.path
+                files = sorted(path.rglob("*")) if path.is_dir() else [path]
+                parts += [
+                    f"{f}:{f.stat().st_mtime_ns}:{f.stat().st_size}"
+                    for f in files
+                    if f.is_file()
+                ]
+        return hashlib.blake2b("\n".join(parts).encode(), digest_size=16).hexdigest()
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        fingerprint = self.fingerprint()
+        if fingerprint != self._sources_fingerprint:
+            # a join source file changed since it was loaded
+            self._sources = {}
+            self._sources_fingerprint = fingerprint
+        df = df.copy()
+        for i, rule in enumerate(self.spec.rules):
+            if isinstance(rule, JoinRule):
+                if i not in self._sources:
+                    self._sources[i] = rule.load(self.base)
+                joined = rule.apply(df, self._sources[i])
+                for column in joined.columns:
+                    df[column] = joined[column]
+            else:
+                df[rule.output] = rule.apply(df)
+        return df
+
+
+def _normalize(value: str) -> str:
+    return value.strip().lower()
+
+
+def _per_unique(
+    labels: np.ndarray, codes: np.ndarray, index: pd.Index, default: Optional[str]
+) -> pd.Series:
+    """
+    Spread labels computed once per distinct value (from pd.factorize) back to
+    every row. Lead columns repeat a lot, so string work on the distinct values
+    is far cheaper than on the rows.
+    """
+    # code -1 marks a missing value; it picks the trailing `default`
+    values = np.append(labels, default)[codes]
+    return _with_default(pd.Series(values, index=index, dtype=object), default)
+
+
+def _with_default(values: pd.Series, default: Optional[str]) -> pd.Series:
+    return values.where(values.notna(), default) if default is not None else values
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+CACHE_DIR = Path(
+    os.getenv("PREF_DEMO_CACHE_DIR", Path(__file__).resolve().parent / ".cache")
+)
+DEFAULT_QUERY_CACHE_DIR = CACHE_DIR / "queries"
+
+# quoted literals and identifiers, which normalization must leave alone
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+_NAME = r"""(?:[\w$]+|"(?:[^"]|"")+")"""
+# string literals, dotted names and single characters, in order
+_TOKEN = re.compile(rf"""'(?:[^']|'')*'|{_NAME}(?:\.{_NAME})*|\S""")
+# keywords that end a FROM list
+_CLAUSE_END = set(
+    "where group order having limit offset union except intersect "
+    "qualify window select set values returning".split()
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Collapse whitespace and lowercase keywords and names outside quotes, so
+    queries that differ only in layout share a cache entry.
+    """
+    parts = _QUOTED.split(sql.strip().rstrip(";"))
+    return "".join(
+        part if i % 2 else re.sub(r"\s+", " ", part).lower()
+        for i, part in enumerate(parts)
+    ).strip()
+
+
+def referenced_tables(sql: str) -> List[str]:
+    """
+    Names of the tables a query reads, lowercased and unquoted.
+
+    These are the names after FROM and JOIN, including every item of a
+    comma-separated FROM list, at any subquery depth. The result may include
+    extra names, e.g. of CTEs, which only cost an unneeded invalidation.
+    """
+    tokens = _TOKEN.findall(normalize_sql(sql))
+    tables = set()
+    # in_list: inside a FROM list at this depth; expect: next name is a table
+    in_list = expect = False
+    outer = []
+    for i, token in enumerate(tokens):
+        if token in ("from", "join"):
+            in_list = expect = True
+        elif token == "(":
+            outer.append(in_list)
+            in_list = expect = False
+        elif token == ")":
+            in_list, expect = outer.pop() if outer else False, False
+        elif token == ",":
+            expect = in_list
+        elif token in _CLAUSE_END:
+            in_list = expect = False
+        elif expect and token not in ("lateral", "only"):
+            expect = False
+            following = tokens[i + 1] if i + 1 < len(tokens) else ""
+            # a table function such as flatten(...) is not a table
+            if token[0] != "'" and following != "(" and re.match(r'[\w$"]', token):
+                tables.add(_table_name(token))
+    return sorted(tables)
+
+
+def _table_name(name: str) -> str:
+    return name.replace('"', "").lower()
+
+
+def _base_name(table: str) -> str:
+    # generations are kept per unqualified name, which covers every schema
+    return _table_name(table).rsplit(".", 1)[-1]
+
+
+class QueryCache:
+    """
+    Query results as local Parquet files, indexed in SQLite.
+
+    Entries are keyed by normalized SQL, parameters and a namespace (the
+    database they came from) and remember which tables the query read.
+    Results older than the caller's TTL are ignored, writing to a table drops
+    every entry that read it, and the least recently used entries are
+    evicted once the files outgrow `max_bytes`.
+
+    Every invalidation also bumps the table's generation. Take
+    `generation(sql)` before running a query and pass it to `put`: a result
+    read before a write that finished in the meantime is then not stored.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_QUERY_CACHE_DIR,
+        max_bytes: int = int(os.getenv("PREF_DEMO_QUERY_CACHE_MB", "1024")) << 20,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _index(self) -> sqlite3.Connection:
+        # created on first use, so importing the block never touches the disk
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.directory / "index.sqlite3", check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    tables TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS generations (
+                    name TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def generation(self, sql: str) -> int:
+        """A number that changes whenever a table `sql` reads is invalidated."""
+        with self._lock:
+            return self._generation(self._index(), referenced_tables(sql))
+
+    @staticmethod
+    def _generation(conn: sqlite3.Connection, tables: List[str]) -> int:
+        names = sorted({_base_name(table) for table in tables})
+        if not names:
+            return 0
+        # generations only grow, so their sum changes whenever any one does
+        row = conn.execute(
+            "SELECT COALESCE(SUM(generation), 0) FROM generations WHERE name IN "
+            f"({', '.join('?' * len(names))})",
+            names,
+        ).fetchone()
+        return row[0]
+
+    def key(self, namespace: str, sql: str, params: Optional[dict] = None) -> str:
+        payload = json.dumps(
+            [namespace, normalize_sql(sql), params or {}], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.parquet"
+
+    def get(
+        self, key: str, ttl: float, dtype_backend: Optional[str] = None
+    ) -> Optional[pd.DataFrame]:
+        with self._lock:
+            conn = self._index()
+            row = conn.execute(
+                "SELECT created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] < time.time() - ttl:
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE entries SET used_at = ? WHERE key = ?", (time.time(), key)
+            )
+            conn.commit()
+        options = dict(dtype_backend=dtype_backend) if dtype_backend else {}
+        try:
+            df = pd.read_parquet(self._path(key), **options)
+        except (OSError, ValueError):
+            # the file went missing or is unreadable: treat as a miss
+            self._drop([key])
+            self.misses += 1
+            return None
+        self.hits += 1
+        return df
+
+    def put(
+        self,
+        key: str,
+        namespace: str,
+        sql: str,
+        df: pd.DataFrame,
+        generation: Optional[int] = None,
+    ) -> None:
+        """
+        Store a query result. With the `generation` taken before the query
+        ran, a result that a write has made stale since is dropped instead.
+        """
+        path = self._path(key)
+        partial = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(partial, index=False, compression="zstd")
+        except Exception as exc:
+            # caching is best effort and must never fail the read itself
+            partial.unlink(missing_ok=True)
+            warnings.warn(f"could not cache query result: {exc!r}")
+            return
+        tables = referenced_tables(sql)
+        now = time.time()
+        with self._lock:
+            conn = self._index()
+            # the check and the insert happen in one write transaction, so an
+            # invalidation in another process lands either before or after both
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if generation is not None and generation != self._generation(
+                    conn, tables
+                ):
+                    partial.unlink(missing_ok=True)
+                    return
+                os.replace(partial, path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        namespace,
+                        json.dumps(tables),
+                        path.stat().st_size,
+                        now,
+                        now,
+                    ),
+                )
+            finally:
+                conn.commit()
+        self._evict()
+
+    def invalidate(self, table: str, namespace: Optional[str] = None) -> int:
+        """
+        Drop the entries that read `table`, in `namespace` or everywhere.
+
+        Names match when equal or when one is the other with a schema
+        qualifier, so "leads" also drops queries of "salesforce.leads".
+        Returns the number of entries dropped.
+        """
+        table = _table_name(table)
+        with self._lock:
+            conn = self._index()
+            # first, so a read that started before the write can't be stored
+            conn.execute(
+                "INSERT INTO generations VALUES (?, 1) ON CONFLICT (name) "
+                "DO UPDATE SET generation = generation + 1",
+                (_base_name(table),),
+            )
+            conn.commit()
+            rows = conn.execute("SELECT key, namespace, tables FROM entries").fetchall()
+        stale = [
+            key
+            for key, entry_namespace, tables in rows
+            if namespace in (None, entry_namespace)
+            and any(_same_table(table, name) for name in json.loads(tables))
+        ]
+        self._drop(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = [key for key, in self._index().execute("SELECT key FROM entries")]
+        self._drop(keys)
+
+    def _evict(self) -> None:
+        with self._lock:
+            rows = self._index().execute(
+                "SELECT key, bytes FROM entries ORDER BY used_at DESC"
+            ).fetchall()
+        total, evicted = 0, []
+        for key, size in rows:
+            total += size
+            if total > self.max_bytes:
+                evicted.append(key)
+        self._drop(evicted)
+
+    def _drop(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        with self._lock:
+            conn = self._index()
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+            conn.commit()
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / total if total else 0.0,
+        )
+
+
+def _same_table(a: str, b: str) -> bool:
+    return a == b or a.endswith(f".{b}") or b.endswith(f".{a}")
+
+
+query_cache = QueryCache()
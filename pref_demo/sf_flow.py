@@ -1,12 +1,11 @@
-import random
-import time
-from datetime import timedelta, datetime
+from datetime import datetime, timezone
 from io import StringIO
-from typing import List, Union
+from typing import Iterator, List, Optional, Tuple, Union
 
 import pandas as pd
 from prefect import flow, task
-from prefect.tasks import exponential_backoff, task_input_hash
+from prefect.tasks import exponential_backoff
+from prefect.variables import Variable
 from pydantic import BaseModel
 from snowflake_blocks import SnowflakeConnection  # Import the custom block
 from artifacts import (
@@ -14,68 +13,274 @@ from artifacts import (
     create_analysis_artifact,
 )  # Import the artifact functions
 from my_classes import SalesforceLead
+from enrichment import EnrichmentEngine
+from artifact_store import artifact_store
+
+LEADS_QUERY = "SELECT * FROM salesforce.leads"
+ENRICHED_LEADS_TABLE = "salesforce_leads_enriched"
+DEFAULT_CHUNK_SIZE = 50_000
+
+enrichment_engine = EnrichmentEngine.from_yaml()
+
+# Prefect Variable holding the LastModifiedDate of the newest lead processed
+# by an incremental run
+WATERMARK_VARIABLE = "salesforce_leads_watermark"
+
+DEMO_LEADS_CSV = """
+Lead,Title,Company,Email,Phone,Lead Status,Lead Owner,Industry,Annual Revenue,LastModifiedDate
+John Doe,Lead Software Developer,TechCorp,john.doe@techcorp.com,,Nurture,Shane Nordstrand,oil & energy,5000000,2024-03-01T09:30:00
+Jane Smith,Software Engineer,InnoTech,jane.smith@innotech.com,555-1234,Nurture,Shane Nordstrand,software,12000000,2024-06-15T14:00:00
+"""
+
+
+def _utc(value: datetime) -> datetime:
+    """Naive UTC, the way Salesforce timestamps land in the warehouse."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def leads_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[tuple] = None,
+    limit: Optional[int] = None,
+) -> Tuple[str, dict]:
+    """
+    The leads query for LastModifiedDate in (since, until], with its params.
+
+    With `limit`, one page of at most `limit` leads ordered by
+    (LastModifiedDate, Email), starting after the `after` pair of the
+    previous page's last lead. Leads without an Email are left out: they
+    can't be paged past, and saving them is skipped anyway.
+    """
+    conditions, params = [], {}
+    if since is not None:
+        conditions.append("LastModifiedDate > :since")
+        params["since"] = _utc(since)
+    if until is not None:
+        conditions.append("LastModifiedDate <= :until")
+        params["until"] = _utc(until)
+    if limit is not None:
+        conditions.append("Email IS NOT NULL")
+        if after is not None:
+            conditions.append(
+                "(LastModifiedDate > :after_modified OR "
+                "(LastModifiedDate = :after_modified AND Email > :after_email))"
+            )
+            params["after_modified"], params["after_email"] = after
+    if not conditions:
+        return LEADS_QUERY, params
+    query = f"{LEADS_QUERY} WHERE {' AND '.join(conditions)} ORDER BY LastModifiedDate"
+    if limit is not None:
+        query += f", Email LIMIT {int(limit)}"
+    return query, params
+
+
+def _column(df: pd.DataFrame, name: str) -> str:
+    # warehouses differ in how they case unquoted column names
+    return next(c for c in df.columns if c.lower() == name.lower())
+
+
+def _modified_column(df: pd.DataFrame) -> str:
+    return _column(df, "LastModifiedDate")
+
+
+def load_watermark(default: datetime) -> datetime:
+    value = Variable.get(WATERMARK_VARIABLE, default=None)
+    return datetime.fromisoformat(value) if value else _utc(default)
+
+
+def save_watermark(value: datetime) -> None:
+    Variable.set(WATERMARK_VARIABLE, _utc(value).isoformat(), overwrite=True)
 
 
 @task(retries=3, retry_delay_seconds=exponential_backoff(backoff_factor=2))
 def fetch_salesforce_data():
-    time.sleep(random.uniform(2, 3))
-    snowflake_conn = SnowflakeConnection.load("my-snowflake-conn")
-    data = snowflake_conn.read_sql("SELECT * FROM salesforce.leads")
-    data_restructured = """
-    Lead,Title,Company,Email,Phone,Lead Status,Lead Owner,Industry,Annual Revenue
-    John Doe,Lead Software Developer,TechCorp,john.doe@techcorp.com,,Nurture,Shane Nordstrand,oil & energy,5000000
-    Jane Smith,Software Engineer,InnoTech,jane.smith@innotech.com,555-1234,Nurture,Shane Nordstrand,software,12000000
+    """The demo leads, for a block without a warehouse behind it."""
+    return DEMO_LEADS_CSV
+
+
+def iter_salesforce_batches(
+    chunk_size: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield leads in DataFrames of at most `chunk_size` rows.
+
+    With `since` / `until`, only leads whose LastModifiedDate falls in
+    (since, until] are read.
+
+    Warehouse leads are read a page at a time (see `leads_query`), each page
+    by its own short query, so no cursor or read transaction stays open
+    while a chunk is being saved.
     """
-    return data_restructured
+    snowflake_conn = SnowflakeConnection.load("my-snowflake-conn")
+    if snowflake_conn.connection_url is not None:
+        after = None
+        while True:
+            query, params = leads_query(since, until, after=after, limit=chunk_size)
+            chunk = snowflake_conn.read_sql(query, params, use_cache=False)
+            if len(chunk):
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+            last = chunk.iloc[-1]
+            modified = last[_modified_column(chunk)]
+            if isinstance(modified, pd.Timestamp):
+                modified = modified.to_pydatetime()
+            after = (modified, last[_column(chunk, "Email")])
+
+    # demo block without a warehouse behind it
+    for chunk in pd.read_csv(StringIO(DEMO_LEADS_CSV), chunksize=chunk_size):
+        modified = pd.to_datetime(chunk["LastModifiedDate"])
+        if since is not None:
+            chunk = chunk[modified > _utc(since)]
+        if until is not None:
+            chunk = chunk[modified <= _utc(until)]
+        if len(chunk):
+            yield chunk
+
+
+# Each stage below is skipped when its input is unchanged since an earlier
+# run: its output is read back from the artifact store instead.
 
 
-@task(cache_key_fn=task_input_hash, cache_expiration=timedelta(days=1))
+@task
+@artifact_store.stage("parsed")
 def convert_csv_to_df(csv_data):
-    df = pd.read_csv(StringIO(csv_data))
-    time.sleep(random.uniform(2, 4))
-    return df
+    return pd.read_csv(StringIO(csv_data))
+
+
+@artifact_store.stage("analyzed")
+def count_by_industry(df: pd.DataFrame) -> pd.Series:
+    return df["Industry"].value_counts()
 
 
 @task(retries=4)
-def analyze_data(df):
+def analyze_data(df, report: bool = True):
     # Simple analysis: Count the number of leads by industry
-    industry_counts = df["Industry"].value_counts()
-    time.sleep(random.uniform(1, 2))
+    industry_counts = count_by_industry(df)
 
     # Create a Markdown artifact after data analysis
-    create_analysis_artifact(industry_counts)
+    if report:
+        create_analysis_artifact(industry_counts)
 
     return industry_counts
 
 
+# a new rule or join source file invalidates the stored enriched leads
+@artifact_store.stage("enriched", version=enrichment_engine.fingerprint)
+def enrich_leads(df: pd.DataFrame) -> pd.DataFrame:
+    return enrichment_engine.apply(df)
+
+
 @task
-def enrich_data(df):
-    # Enrich data with a new column 'Lead Quality' based on 'Annual Revenue'
-    df["Lead Quality"] = df["Annual Revenue"].apply(
-        lambda x: "High" if x > 10000000 else "Medium"
-    )
-    time.sleep(random.uniform(3, 5))
+def enrich_data(df, report: bool = True):
+    # Enrich data with 'Lead Quality', revenue bands, title seniority, ICP
+    # scores, ... as declared in enrichment_rules.yaml
+    df = enrich_leads(df)
 
     # Create a Markdown artifact after data enrichment
-    create_enriched_data_artifact(df)
+    if report:
+        create_enriched_data_artifact(df)
 
     return df
 
 
 @task
 def save_to_database(df):
-    # Simulate saving the DataFrame to a database
+    """Upsert the enriched leads on Email with one bulk load."""
     print("Saving DataFrame to database...")
-    time.sleep(random.uniform(2, 3))
-    return "Data saved successfully"
+    snowflake_conn = SnowflakeConnection.load("my-snowflake-conn")
+    rows = snowflake_conn.load_raw_data(df, ENRICHED_LEADS_TABLE, merge_key="Email")
+    return f"Data saved successfully ({rows} leads)"
+
+
+def ingest_in_chunks(
+    chunk_size: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Tuple[str, Optional[datetime]]:
+    """
+    Stream the leads through enrich -> analyze -> save one chunk at a time.
+
+    Only the running industry counts outlive a chunk, so peak memory depends
+    on `chunk_size` rather than on the size of the leads table. Each chunk's
+    enriched leads and counts are kept in the artifact store, so a re-run
+    after a failure still reads every chunk but only enriches those whose
+    leads (or the rules) changed, as long as the stored results have not
+    been evicted.
+
+    Returns:
+        Tuple[str, Optional[datetime]]: The save result and the newest
+        LastModifiedDate seen, or None if there were no leads.
+    """
+    industry_counts = pd.Series(dtype="int64")
+    rows = chunks = 0
+    newest = None
+    for chunk in iter_salesforce_batches(chunk_size, since, until):
+        chunk_newest = pd.to_datetime(chunk[_modified_column(chunk)]).max()
+        newest = chunk_newest if newest is None else max(newest, chunk_newest)
+        # one sample report for the run instead of one per chunk
+        enriched_df = enrich_data(chunk, report=chunks == 0)
+        counts = analyze_data(enriched_df, report=False)
+        industry_counts = industry_counts.add(counts, fill_value=0)
+        save_to_database(enriched_df)
+        rows += len(chunk)
+        chunks += 1
+
+    analysis_result = industry_counts.astype("int64").sort_values(ascending=False)
+    create_analysis_artifact(analysis_result)
+    print(f"Analysis Result:\n{analysis_result}")
+
+    result = f"Data saved successfully ({rows} leads in {chunks} chunks)"
+    return result, newest.to_pydatetime() if newest is not None else None
 
 
 @flow(persist_result=True)
 def salesforce_data_pipeline(
     start_date: datetime = datetime(2023, 1, 1),
     report_type: Union[str, List[str]] = ["mql", "detailed"],
+    chunk_size: Optional[int] = None,
+    incremental: bool = False,
+    backfill_start: Optional[datetime] = None,
+    backfill_end: Optional[datetime] = None,
 ):
+    """
+    Enrich, analyze and save the Salesforce leads.
+
+    Leads from a warehouse are always streamed in chunks of `chunk_size`
+    (default DEFAULT_CHUNK_SIZE); only the demo leads of a block without a
+    connection URL are processed in one go. With `incremental`, only leads modified
+    since the stored watermark (initially `start_date`) are processed, and
+    the watermark then moves to the newest one seen. `backfill_start` /
+    `backfill_end` reprocess a LastModifiedDate range without moving it.
+    """
     print(f"Flow started with start_date: {start_date} and report_type: {report_type}")
+    if backfill_start or backfill_end:
+        result, _ = ingest_in_chunks(
+            chunk_size or DEFAULT_CHUNK_SIZE, since=backfill_start, until=backfill_end
+        )
+        return result
+    if incremental:
+        since = load_watermark(default=start_date)
+        # fixed upper bound, so leads changed during the run wait for the next one
+        until = datetime.now(timezone.utc)
+        print(f"Processing leads modified after {since} up to {_utc(until)}")
+        result, newest = ingest_in_chunks(
+            chunk_size or DEFAULT_CHUNK_SIZE, since=since, until=until
+        )
+        if newest is not None:
+            save_watermark(newest)
+        return result
+    snowflake_conn = SnowflakeConnection.load("my-snowflake-conn")
+    if chunk_size or snowflake_conn.connection_url is not None:
+        # never read the whole leads table into memory at once
+        result, _ = ingest_in_chunks(chunk_size or DEFAULT_CHUNK_SIZE)
+        return result
+
     raw_data = fetch_salesforce_data()
     df = convert_csv_to_df(raw_data)
     enriched_df = enrich_data(df)
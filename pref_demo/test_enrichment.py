@@ -0,0 +1,154 @@
+import pandas as pd
+import pytest
+
+from enrichment import EnrichmentEngine, EnrichmentSpec, JoinRule
+
+ICP_JOIN = dict(
+    kind="join",
+    path="results/parquet",
+    column="Company",
+    key="company",
+    where="status == 'ok'",
+    latest_by="completed_at",
+    columns={"icp_score.score": "ICP Score"},
+)
+
+
+def engine(tmp_path, *rules):
+    spec = EnrichmentSpec.model_validate({"rules": list(rules)})
+    return EnrichmentEngine(spec, base=tmp_path)
+
+
+def write_part(tmp_path, run_date, rows):
+    """A partition as find_icp's ResultsSink writes it."""
+    path = tmp_path / "results" / "parquet" / f"run_date={run_date}"
+    path.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows).to_parquet(path / "part-0.parquet", index=False)
+
+
+def error_row(company, completed_at):
+    return dict(
+        company=company, completed_at=completed_at, status="error", error="timeout"
+    )
+
+
+def ok_row(company, completed_at, score):
+    return {
+        "company": company,
+        "completed_at": completed_at,
+        "status": "ok",
+        "error": None,
+        "icp_score.score": score,
+    }
+
+
+def test_rules_add_columns_in_order(tmp_path):
+    leads = pd.DataFrame(
+        {
+            "Annual Revenue": [500_000, 20_000_000, None],
+            "Industry": [" Banking", "SOFTWARE", None],
+            "Title": ["VP of Data", "Senior Engineer", "Chief Executive"],
+        }
+    )
+    enriched = engine(
+        tmp_path,
+        dict(
+            kind="band",
+            output="Revenue Band",
+            column="Annual Revenue",
+            bins=[0, 1_000_000, 10_000_000, float("inf")],
+            labels=["Small", "Mid", "Large"],
+            default="Unknown",
+        ),
+        dict(
+            kind="expression",
+            output="Revenue (M)",
+            expression="`Annual Revenue` / 1000000",
+        ),
+        dict(
+            kind="map",
+            output="Industry Group",
+            column="Industry",
+            mapping={"banking": "Financial Services", "software": "Technology"},
+            default="Other",
+        ),
+        dict(
+            kind="keywords",
+            output="Seniority",
+            column="Title",
+            keywords={"C-Level": ["chief"], "VP": ["vp"], "Senior": ["senior"]},
+        ),
+        # a later rule may use a column added by an earlier one
+        dict(
+            kind="map",
+            output="Segment",
+            column="Revenue Band",
+            mapping={"large": "Strategic"},
+            default="Commercial",
+        ),
+    ).apply(leads)
+
+    assert enriched["Revenue Band"].tolist() == ["Small", "Large", "Unknown"]
+    assert enriched["Revenue (M)"].tolist()[:2] == [0.5, 20.0]
+    assert enriched["Industry Group"].tolist() == [
+        "Financial Services",
+        "Technology",
+        "Other",
+    ]
+    assert enriched["Seniority"].tolist() == ["VP", "Senior", "C-Level"]
+    assert enriched["Segment"].tolist() == ["Commercial", "Strategic", "Commercial"]
+    assert "Revenue Band" not in leads
+
+
+def test_join_reads_partitions_with_only_error_rows(tmp_path):
+    # the first partition pyarrow sees has no icp_score.* columns at all
+    write_part(tmp_path, "2024-07-01", [error_row("Acme", "2024-07-01T09:00")])
+    write_part(
+        tmp_path,
+        "2024-07-02",
+        [
+            ok_row("acme ", "2024-07-02T09:00", 80.0),
+            error_row("Globex", "2024-07-02T10:00"),
+        ],
+    )
+    write_part(tmp_path, "2024-07-03", [ok_row("ACME", "2024-07-03T09:00", 55.0)])
+    leads = pd.DataFrame({"Company": ["Acme", "Globex", "Initech"]})
+
+    enriched = engine(tmp_path, ICP_JOIN).apply(leads)
+
+    # the newest ok row wins; keys match ignoring case and whitespace
+    assert enriched["ICP Score"].tolist()[0] == 55.0
+    assert enriched["ICP Score"].isna().tolist() == [False, True, True]
+
+
+def test_join_with_error_rows_only(tmp_path):
+    write_part(tmp_path, "2024-07-01", [error_row("Acme", "2024-07-01T09:00")])
+    leads = pd.DataFrame({"Company": ["Acme"]})
+
+    with pytest.warns(UserWarning, match="no 'icp_score.score'"):
+        enriched = engine(tmp_path, ICP_JOIN).apply(leads)
+
+    assert enriched["ICP Score"].isna().all()
+
+
+def test_join_source_without_key_column(tmp_path):
+    write_part(tmp_path, "2024-07-01", [{"name": "Acme", "status": "ok"}])
+    rule = JoinRule.model_validate(ICP_JOIN)
+
+    with pytest.warns(UserWarning, match="no 'company' column"):
+        assert rule.load(tmp_path) is None
+
+    leads = pd.DataFrame({"Company": ["Acme"]})
+    with pytest.warns(UserWarning):
+        enriched = engine(tmp_path, ICP_JOIN).apply(leads)
+    assert enriched["ICP Score"].isna().all()
+
+
+def test_join_source_is_reloaded_when_files_change(tmp_path):
+    write_part(tmp_path, "2024-07-01", [ok_row("Acme", "2024-07-01T09:00", 40.0)])
+    leads = pd.DataFrame({"Company": ["Acme"]})
+    icp = engine(tmp_path, ICP_JOIN)
+    assert icp.apply(leads)["ICP Score"].tolist() == [40.0]
+
+    write_part(tmp_path, "2024-07-02", [ok_row("Acme", "2024-07-02T09:00", 90.0)])
+    assert icp.apply(leads)["ICP Score"].tolist() == [90.0]
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from query_cache import QueryCache, referenced_tables
+
+
+@pytest.mark.parametrize(
+    "sql, tables",
+    [
+        ("SELECT * FROM leads", ["leads"]),
+        ("select * from a x join b as y on x.id = y.id", ["a", "b"]),
+        ("SELECT * FROM a, b WHERE a.id = b.id", ["a", "b"]),
+        ("select * from a join b using (id), c", ["a", "b", "c"]),
+        ("select * from (select * from c) s, d where s.id = d.id", ["c", "d"]),
+        ("select * from a where id in (select id from b, c)", ["a", "b", "c"]),
+        (
+            'SELECT * FROM "Sales"."Leads" l, salesforce.leads',
+            ["sales.leads", "salesforce.leads"],
+        ),
+        ("select * from t, lateral flatten(input => t.v) f", ["t"]),
+        ("select 'from x, y' from t", ["t"]),
+    ],
+)
+def test_referenced_tables(sql, tables):
+    assert referenced_tables(sql) == tables
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryCache(tmp_path)
+
+
+def test_invalidate_drops_comma_joined_queries(cache):
+    df = pd.DataFrame({"n": [1]})
+    sql = "SELECT COUNT(*) AS n FROM accounts a, salesforce.leads l"
+    key = cache.key("ns", sql)
+    cache.put(key, "ns", sql, df)
+    assert cache.get(key, ttl=60) is not None
+
+    assert cache.invalidate("leads", "ns") == 1
+    assert cache.get(key, ttl=60) is None
+
+
+def test_put_skips_results_read_before_an_invalidation(cache):
+    df = pd.DataFrame({"n": [1]})
+    sql = "SELECT * FROM leads"
+    key = cache.key("ns", sql)
+
+    generation = cache.generation(sql)
+    # the table is written while the query runs
+    cache.invalidate("salesforce.leads", "ns")
+    cache.put(key, "ns", sql, df, generation)
+    assert cache.get(key, ttl=60) is None
+    assert not list(cache.directory.glob("*.parquet"))
+
+    cache.put(key, "ns", sql, df, cache.generation(sql))
+    pd.testing.assert_frame_equal(cache.get(key, ttl=60), df)
+
+
+def test_generation_ignores_other_tables(cache):
+    sql = "SELECT * FROM leads"
+    generation = cache.generation(sql)
+    cache.invalidate("accounts")
+    assert cache.generation(sql) == generation
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import sf_flow
+
+
+@pytest.fixture
+def warehouse(sqlite_conn, tmp_path, monkeypatch):
+    """Leads in SQLite, and the flow's block, reports and artifact store set up."""
+    leads = pd.DataFrame(
+        {
+            "Lead": [f"Lead {i}" for i in range(7)],
+            "Title": ["CTO", "Engineer", "VP Sales", "Analyst", "CEO", "Intern", "Dev"],
+            "Company": [f"Company {i}" for i in range(7)],
+            "Email": [f"lead{i}@example.com" for i in range(7)],
+            "Phone": ["555-1234"] * 7,
+            "Lead Status": ["Nurture"] * 7,
+            "Lead Owner": ["Shane Nordstrand"] * 7,
+            "Industry": ["software"] * 4 + ["oil & energy"] * 3,
+            "Annual Revenue": [5_000_000] * 7,
+            # ties, so paging must go past equal timestamps
+            "LastModifiedDate": pd.to_datetime(
+                ["2024-01-01"] * 3 + ["2024-02-01"] * 2 + ["2024-03-01"] * 2
+            ),
+        }
+    )
+    with sqlite_conn.session() as conn:
+        leads.to_sql("leads", conn, index=False)
+    monkeypatch.setattr(sf_flow, "LEADS_QUERY", "SELECT * FROM leads")
+    monkeypatch.setattr(sf_flow.SnowflakeConnection, "load", lambda name: sqlite_conn)
+    for report in ["create_analysis_artifact", "create_enriched_data_artifact"]:
+        monkeypatch.setattr(sf_flow, report, lambda *args: None)
+    store = sf_flow.artifact_store
+    monkeypatch.setattr(store, "directory", tmp_path / "artifacts")
+    monkeypatch.setattr(store, "_conn", None)
+    monkeypatch.setattr(store, "hits", 0)
+    return sqlite_conn
+
+
+def test_ingest_in_chunks_reads_and_saves_every_lead(warehouse):
+    result, newest = sf_flow.ingest_in_chunks(chunk_size=2)
+
+    assert result == "Data saved successfully (7 leads in 4 chunks)"
+    assert newest == datetime(2024, 3, 1)
+    saved = warehouse.read_sql(f"SELECT * FROM {sf_flow.ENRICHED_LEADS_TABLE}")
+    assert sorted(saved["Email"]) == [f"lead{i}@example.com" for i in range(7)]
+
+
+def test_ingest_in_chunks_only_reads_the_window(warehouse):
+    result, newest = sf_flow.ingest_in_chunks(
+        chunk_size=2, since=datetime(2024, 1, 15), until=datetime(2024, 2, 15)
+    )
+
+    assert result == "Data saved successfully (2 leads in 1 chunks)"
+    assert newest == datetime(2024, 2, 1)
+
+
+def test_ingest_in_chunks_rerun_reuses_stored_stages(warehouse):
+    sf_flow.ingest_in_chunks(chunk_size=3)
+    assert sf_flow.artifact_store.hits == 0
+
+    result, _ = sf_flow.ingest_in_chunks(chunk_size=3)
+    assert result == "Data saved successfully (7 leads in 3 chunks)"
+    # enriched and analyzed, for each of the 3 chunks
+    assert sf_flow.artifact_store.hits == 6
@@ -0,0 +1,165 @@
+import re
+import warnings
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine.default import DefaultDialect
+
+import snowflake_blocks
+
+
+def leads(*rows):
+    return pd.DataFrame(rows, columns=["Email", "Company", "Score"])
+
+
+def test_load_raw_data_upserts_on_merge_key(sqlite_conn):
+    sqlite_conn.load_raw_data(
+        leads(("a@x.com", "Acme", 1), ("b@x.com", "Beta", 2)),
+        "leads",
+        merge_key="Email",
+    )
+    loaded = sqlite_conn.load_raw_data(
+        leads(("b@x.com", "Beta Inc", 5), ("c@x.com", "Gamma", 3)),
+        "leads",
+        merge_key="Email",
+    )
+    assert loaded == 2
+
+    df = sqlite_conn.read_sql('SELECT * FROM leads ORDER BY "Email"')
+    assert df["Email"].tolist() == ["a@x.com", "b@x.com", "c@x.com"]
+    assert df["Company"].tolist() == ["Acme", "Beta Inc", "Gamma"]
+    assert df["Score"].tolist() == [1, 5, 3]
+
+
+def test_load_raw_data_reload_is_idempotent(sqlite_conn):
+    frame = leads(*[(f"{i}@x.com", f"Company {i}", i) for i in range(7)])
+    for _ in range(2):
+        # several staged files, so the merge spans more than one part
+        sqlite_conn.load_raw_data(frame, "leads", merge_key="Email", rows_per_file=3)
+
+    df = sqlite_conn.read_sql('SELECT * FROM leads ORDER BY "Score"')
+    pd.testing.assert_frame_equal(df, frame, check_dtype=False)
+
+
+def test_load_raw_data_binds_datetime_columns(sqlite_conn):
+    frame = leads(("a@x.com", "Acme", 1), ("b@x.com", "Beta", 2))
+    frame["CreatedDate"] = pd.to_datetime(["2024-01-02 03:04:05", None])
+    frame["LastModified"] = pd.to_datetime(
+        ["2024-01-02T03:04:05+02:00", "2024-06-01T00:00:00+00:00"], utc=True
+    )
+    sqlite_conn.load_raw_data(frame, "leads", merge_key="Email")
+    sqlite_conn.load_raw_data(frame, "leads", merge_key="Email")
+
+    df = sqlite_conn.read_sql('SELECT * FROM leads ORDER BY "Email"')
+    assert len(df) == 2
+    assert pd.Timestamp(df["CreatedDate"][0]) == pd.Timestamp("2024-01-02 03:04:05")
+    assert df["CreatedDate"].isna()[1]
+    assert pd.Timestamp(df["LastModified"][0]) == pd.Timestamp("2024-01-02 01:04:05")
+
+
+def test_load_raw_data_empty_frame(sqlite_conn):
+    assert sqlite_conn.load_raw_data(leads(), "leads", merge_key="Email") == 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        loaded = sqlite_conn.load_raw_data(
+            leads((None, "Acme", 1), (None, "Beta", 2)), "leads", merge_key="Email"
+        )
+    assert loaded == 0
+    assert sqlite_conn.read_sql("SELECT COUNT(*) AS n FROM leads")["n"][0] == 0
+
+
+def test_load_raw_data_reports_existing_duplicate_keys(sqlite_conn):
+    # e.g. a table written by plain appends before loads were upserts
+    with sqlite_conn.session() as conn:
+        leads(("a@x.com", "Acme", 1), ("a@x.com", "Acme", 2)).to_sql(
+            "leads", conn, index=False
+        )
+    with pytest.raises(ValueError, match="a@x.com"):
+        sqlite_conn.load_raw_data(leads(("b@x.com", "Beta", 3)), "leads", "Email")
+
+
+def test_load_raw_data_leaves_no_staging_tables(sqlite_conn):
+    for _ in range(2):
+        sqlite_conn.load_raw_data(leads(("a@x.com", "Acme", 1)), "leads", "Email")
+    with sqlite_conn.session() as conn:
+        tables = conn.execute(
+            text(
+                "SELECT name FROM sqlite_master "
+                "UNION SELECT name FROM temp.sqlite_master"
+            )
+        ).scalars()
+        assert not [t for t in tables if "staging" in t]
+
+
+class RecordingConnection:
+    """Stands in for a Snowflake connection and records the SQL it is sent."""
+
+    def __init__(self, fail_on=None):
+        self.dialect = SimpleNamespace(
+            name="snowflake", identifier_preparer=DefaultDialect().identifier_preparer
+        )
+        self.fail_on = fail_on
+        self.statements = []
+
+    def exec_driver_sql(self, statement, *args):
+        self.statements.append(statement)
+        if self.fail_on and statement.startswith(self.fail_on):
+            raise RuntimeError("COPY failed")
+
+
+def copy_into_snowflake(conn, merge_key="Email"):
+    paths = [Path("/tmp/load/part-00000.parquet")]
+    snowflake_blocks._copy_into_snowflake(
+        conn, paths, "salesforce", "leads", ["Email", "Lead Status"], merge_key, 4
+    )
+    return conn.statements
+
+
+def test_copy_into_snowflake_merges_through_temporary_objects():
+    create_stage, put, create_table, copy, merge, drop_table, drop_stage = (
+        copy_into_snowflake(RecordingConnection())
+    )
+    stage = re.search(r"STAGE (\w+)", create_stage).group(1)
+    staging = re.search(r"TABLE (\S+) LIKE", create_table).group(1)
+
+    assert create_stage.startswith("CREATE OR REPLACE TEMPORARY STAGE")
+    assert put == (
+        f"PUT 'file:///tmp/load/*.parquet' @{stage} PARALLEL = 4 AUTO_COMPRESS = FALSE"
+    )
+    assert create_table.startswith("CREATE OR REPLACE TEMPORARY TABLE")
+    assert create_table.endswith("LIKE salesforce.leads")
+    assert copy.startswith(f"COPY INTO {staging} FROM @{stage}")
+    assert "MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE" in copy
+    assert merge == (
+        f'MERGE INTO salesforce.leads t USING {staging} s ON t."Email" = s."Email" '
+        'WHEN MATCHED THEN UPDATE SET "Email" = s."Email", '
+        '"Lead Status" = s."Lead Status" '
+        'WHEN NOT MATCHED THEN INSERT ("Email", "Lead Status") '
+        'VALUES (s."Email", s."Lead Status")'
+    )
+    assert drop_table == f"DROP TABLE IF EXISTS {staging}"
+    assert drop_stage == f"DROP STAGE IF EXISTS {stage}"
+
+
+def test_copy_into_snowflake_uses_new_names_per_load():
+    first = copy_into_snowflake(RecordingConnection())
+    second = copy_into_snowflake(RecordingConnection())
+    assert first[0] != second[0] and first[2] != second[2]
+
+
+def test_copy_into_snowflake_without_merge_key_copies_into_the_table():
+    statements = copy_into_snowflake(RecordingConnection(), merge_key=None)
+    assert statements[2].startswith("COPY INTO salesforce.leads FROM @")
+    assert not any(s.startswith("MERGE") for s in statements)
+    assert statements[-1].startswith("DROP STAGE IF EXISTS")
+
+
+def test_copy_into_snowflake_drops_temporary_objects_on_failure():
+    conn = RecordingConnection(fail_on="COPY")
+    with pytest.raises(RuntimeError):
+        copy_into_snowflake(conn)
+    assert conn.statements[-2].startswith("DROP TABLE IF EXISTS")
+    assert conn.statements[-1].startswith("DROP STAGE IF EXISTS")